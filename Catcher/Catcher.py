@@ -1,8 +1,17 @@
 import pygame
 from pygame.locals import *
+import argparse
+import os
 import sys
 import random
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gamekit import capture, profiler, startup, text
+try:
+    from fruits import FruitStorm
+except ImportError:  # numpy is missing, no storm mode
+    FruitStorm = None
+
 WINDOWWIDTH = 300
 WINDOWHEIGHT = 400
 PADDLEWIDTH = 60
@@ -10,10 +19,16 @@ PADDLEHEIGHT = 20
 FRUITSIZE = 10
 
 FPS = 60
+FRUITINTERVAL = 100  # frames between two new fruits
+STORMFRUITS = 5000  # most fruits at once in storm mode
+STORMRATE = 20  # new fruits per frame in storm mode
 
 PADDLECOLOR = (255, 0, 0)
 FRUITCOLOR = (0, 0, 255)
 
+PROFILER = profiler.NullProfiler()
+CAPTURE = capture.NullCapture()
+
 
 class Paddle(pygame.sprite.Sprite):
     def __init__(self, window_width, window_height, width, height, color):
@@ -78,18 +93,31 @@ class Fruit(pygame.sprite.Sprite):
 
 
 class Catcher:
+    fruit_interval = FRUITINTERVAL
+
     def __init__(self, screen, window_width, window_height, width, height, color):
+        """screen can be None for a game that is never drawn, like the rooms of server.py"""
         self.screen = screen
         self.paddle = Paddle(window_width, window_height, width, height, color)
         self.fruits_group = pygame.sprite.Group()
         self.score = 0
         self.missed = 0
+        self.generator = 0  # frames since the last new fruit
 
     def reset(self):
         self.paddle.reset()
         self.fruits_group.empty()
         self.score = 0
         self.missed = 0
+        self.generator = 0
+
+    def set_input(self, direction):
+        """moves the paddle left (-1), right (1) or stops it (0)"""
+        if direction:
+            self.paddle.start_moving()
+            self.paddle.set_direction('right' if direction > 0 else 'left')
+        else:
+            self.paddle.stop_moving()
 
     def _handle_event(self):
         for event in pygame.event.get():
@@ -106,18 +134,39 @@ class Catcher:
                 self.paddle.set_direction('left')
             elif event.type == KEYUP and event.key == K_a:
                 self.paddle.stop_moving()
+            elif event.type == KEYDOWN and event.key == K_F9:
+                CAPTURE.save_highlight()
 
     def add_fruit(self):
         if len(self.fruits_group.sprites()) < 10:
             self.fruits_group.add(Fruit(WINDOWWIDTH, WINDOWHEIGHT, FRUITSIZE, FRUITCOLOR))
 
+    def spawn(self):
+        """adds a fruit every fruit_interval frames"""
+        if self.generator == self.fruit_interval:
+            self.add_fruit()
+            self.generator = 0
+        else:
+            self.generator += 1
+
     def step(self):
+        PROFILER.phase('event')
         self._handle_event()
+        self.update()
+        PROFILER.phase('draw')
+        self.draw()
+
+    def update(self):
+        """one frame of the game logic"""
+        PROFILER.phase('update')
+        self.spawn()
         # move the paddle and fruits
         self.fruits_group.update()
         self.paddle.update()
         # determine if paddle is collided with fruits
+        PROFILER.phase('collision')
         collide_list = pygame.sprite.spritecollide(self.paddle, self.fruits_group, True)
+        PROFILER.phase('update')
         if collide_list:
             self.score += len(collide_list)
         # determine if fruits fall down
@@ -126,37 +175,98 @@ class Catcher:
                 fruit.reset()
                 self.missed += 1
 
+    def draw(self):
         self.screen.fill((0, 0, 0))
         self.fruits_group.draw(self.screen)
         self.paddle.draw(self.screen)
 
     def show_scores(self):
-        font = pygame.font.SysFont('Arial', 16)
-        score_surf = font.render("CATCH: "+str(self.score), True, (0, 255, 0))
+        score_surf = text.render("CATCH: "+str(self.score), 16, (0, 255, 0), 'Arial', sysfont=True)
         score_rect = score_surf.get_rect()
         score_rect.topleft = (40, 40)
         self.screen.blit(score_surf, score_rect)
-        miss_surf = font.render("MISS: "+str(self.missed), True, (0, 255, 0))
+        miss_surf = text.render("MISS: "+str(self.missed), 16, (0, 255, 0), 'Arial', sysfont=True)
         miss_rect = miss_surf.get_rect()
         miss_rect.topright = (WINDOWWIDTH-40, 40)
         self.screen.blit(miss_surf, miss_rect)
 
 
-if __name__ == "__main__":
-    pygame.init()
+class StormCatcher(Catcher):
+    """thousands of fruits, kept in arrays by a FruitStorm instead of sprites"""
+    fruit_interval = 0
+
+    def __init__(self, screen, window_width, window_height, width, height, color, max_fruits=STORMFRUITS):
+        Catcher.__init__(self, screen, window_width, window_height, width, height, color)
+        self.fruits = FruitStorm(window_width, window_height, FRUITSIZE, max_fruits)
+        self.fruit_image = pygame.Surface((FRUITSIZE, FRUITSIZE)).convert()
+        self.fruit_image.fill(FRUITCOLOR)
+
+    def reset(self):
+        Catcher.reset(self)
+        self.fruits.clear()
+
+    def add_fruit(self):
+        self.fruits.add(STORMRATE)
+
+    def update(self):
+        PROFILER.phase('update')
+        self.spawn()
+        # move the paddle and fruits
+        self.fruits.update()
+        self.paddle.update()
+        # determine if paddle is collided with fruits
+        PROFILER.phase('collision')
+        self.score += self.fruits.catch(self.paddle.rect)
+        # determine if fruits fall down
+        PROFILER.phase('update')
+        self.missed += self.fruits.reset_missed()
+
+    def draw(self):
+        self.screen.fill((0, 0, 0))
+        self.fruits.draw(self.screen, self.fruit_image)
+        self.paddle.draw(self.screen)
+
+
+def run(argv=None):
+    """parses the command line and plays, the entry point of the launcher"""
+    global PROFILER, CAPTURE
+    parser = argparse.ArgumentParser(description='Catcher')
+    parser.add_argument('--storm', type=int, nargs='?', const=STORMFRUITS, metavar='FRUITS',
+                        help='storm mode, new fruits every frame up to FRUITS at once (default {})'.format(STORMFRUITS))
+    profiler.add_arguments(parser)
+    capture.add_arguments(parser)
+    args = parser.parse_args(argv)
+    PROFILER = profiler.from_arguments(args)
+    if args.storm and FruitStorm is None:
+        parser.error('storm mode needs numpy')
+    if (args.capture or args.highlight) and not capture.AVAILABLE:
+        parser.error('recording needs numpy')
+    CAPTURE = capture.from_arguments(args, FPS)
+
+    startup.init('display', 'font')
     DISPLAYSURF = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
     FPSCLOCK = pygame.time.Clock()
     pygame.display.set_caption('Catcher')
 
-    game = Catcher(DISPLAYSURF, WINDOWWIDTH, WINDOWHEIGHT, PADDLEWIDTH, PADDLEHEIGHT, PADDLECOLOR)
-    generator = 0
+    if args.storm:
+        game = StormCatcher(DISPLAYSURF, WINDOWWIDTH, WINDOWHEIGHT, PADDLEWIDTH, PADDLEHEIGHT, PADDLECOLOR,
+                            args.storm)
+    else:
+        game = Catcher(DISPLAYSURF, WINDOWWIDTH, WINDOWHEIGHT, PADDLEWIDTH, PADDLEHEIGHT, PADDLECOLOR)
+    startup.phase('first frame')
     while True:
-        if generator == 100:
-            game.add_fruit()
-            generator = 0
-        else:
-            generator += 1
+        PROFILER.begin_frame()
         game.step()
         game.show_scores()
+        PROFILER.draw_hud(DISPLAYSURF)
+        PROFILER.phase('flip')
+        CAPTURE.capture(DISPLAYSURF)
         pygame.display.update()
+        startup.first_frame()
+        PROFILER.phase('tick')
         FPSCLOCK.tick(FPS)
+        PROFILER.end_frame()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,89 @@
+"""
+Fruit storm engine
+
+Keeps thousands of fruits as arrays instead of one Sprite per fruit: the
+center x/y and speed of fruit i are x[i], y[i], speed[i] for i < count.
+Moving, catching and missing are array operations over all fruits, and
+all fruits are drawn with one shared image in one blits call. The rules
+are those of Fruit and Catcher.step: a fruit starts at a random x on the
+top edge with a random speed of 1 to 5, a fruit whose rect overlaps the
+paddle is caught and removed, and a fruit below the window is missed and
+starts over (Fruit.reset).
+"""
+
+from itertools import repeat
+
+import numpy as np
+
+
+class FruitStorm:
+    def __init__(self, window_width, window_height, size, capacity, seed=None):
+        self.window_width = window_width
+        self.window_height = window_height
+        self.size = size
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.speed = np.zeros(capacity, dtype=np.int32)
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, count=1):
+        """adds fruits up to the capacity, returns how many were added"""
+        count = min(count, self.capacity - self.count)
+        self.reset(slice(self.count, self.count + count))
+        self.count += count
+        return count
+
+    def reset(self, index):
+        """puts the fruits back on the top edge, like Fruit.reset"""
+        n = len(self.x[index])
+        self.x[index] = self.rng.integers(0, self.window_width, n, endpoint=True)
+        self.y[index] = 0
+        self.speed[index] = self.rng.integers(1, 5, n, endpoint=True)
+
+    def update(self):
+        n = self.count
+        self.y[:n] += self.speed[:n]
+
+    def _lefts_tops(self):
+        n = self.count
+        half = self.size // 2
+        return self.x[:n] - half, self.y[:n] - half
+
+    def catch(self, rect):
+        """removes the fruits overlapping rect, returns how many"""
+        n = self.count
+        left, top = self._lefts_tops()
+        # Rect.colliderect
+        hit = ((left < rect.right) & (left + self.size > rect.left) &
+               (top < rect.bottom) & (top + self.size > rect.top))
+        caught = int(np.count_nonzero(hit))
+        if caught:
+            keep = ~hit
+            remaining = n - caught
+            for values in (self.x, self.y, self.speed):
+                values[:remaining] = values[:n][keep]
+            self.count = remaining
+        return caught
+
+    def reset_missed(self):
+        """starts the fruits below the window over, returns how many"""
+        missed = np.flatnonzero(self.y[:self.count] > self.window_height)
+        if len(missed):
+            self.reset(missed)
+        return len(missed)
+
+    def draw(self, surface, image):
+        left, top = self._lefts_tops()
+        blits = zip(repeat(image), zip(left.tolist(), top.tolist()))
+        if hasattr(surface, 'fblits'):  # pygame-ce
+            surface.fblits(blits)
+        else:
+            surface.blits(blits, False)
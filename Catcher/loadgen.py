@@ -0,0 +1,129 @@
+"""
+Load generator for server.py
+
+Opens --clients connections to the server; client i joins room i % --rooms,
+so the first --rooms clients play and the rest watch. Players send a random
+paddle input every so often, and every client decodes every message it gets.
+At the end it prints the messages and bytes received, how many were
+keyframes, and the gaps between two messages of a client against the tick
+period, which shows the tick jitter as the clients see it:
+    python server.py &
+    python loadgen.py --clients 400 --rooms 200 --duration 20
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import protocol
+from server import PORT
+from Catcher import FPS
+from gamekit.stats import percentiles
+
+INPUTINTERVAL = (0.1, 1.0)  # seconds between two inputs of a player
+
+
+class LoadStats:
+    def __init__(self):
+        self.connected = 0
+        self.messages = 0
+        self.keyframes = 0
+        self.bytes = 0
+        self.inputs = 0
+        self.errors = 0
+        self.gaps = []  # seconds between two messages of one client
+
+
+async def play(writer, stats, stop_time):
+    loop = asyncio.get_running_loop()
+    while loop.time() < stop_time:
+        await asyncio.sleep(random.uniform(*INPUTINTERVAL))
+        writer.write(protocol.input_message(random.choice((-1, 0, 1))))
+        stats.inputs += 1
+
+
+async def run_client(host, port, room, player, stats, stop_time):
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    stats.connected += 1
+    writer.write(protocol.join(room))
+    player_task = asyncio.ensure_future(play(writer, stats, stop_time)) if player else None
+    decoder = protocol.StateDecoder()
+    last_arrival = None
+    try:
+        while True:
+            timeout = stop_time - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                payload = await asyncio.wait_for(protocol.read_frame(reader), timeout)
+            except asyncio.TimeoutError:
+                break
+            if payload is None:
+                break
+            now = loop.time()
+            if last_arrival is not None:
+                stats.gaps.append(now - last_arrival)
+            last_arrival = now
+            stats.messages += 1
+            stats.bytes += len(payload) + 2
+            if payload[:1] == protocol.KEYFRAME:
+                stats.keyframes += 1
+            try:
+                decoder.decode(payload)
+            except (ValueError, IndexError):
+                stats.errors += 1
+    finally:
+        if player_task is not None:
+            player_task.cancel()
+        writer.close()
+
+
+async def generate(host, port, clients, rooms, duration, connect_rate):
+    stats = LoadStats()
+    loop = asyncio.get_running_loop()
+    stop_time = loop.time() + duration
+    tasks = []
+    for i in range(clients):
+        tasks.append(asyncio.ensure_future(run_client(host, port, i % rooms, i < rooms, stats, stop_time)))
+        if connect_rate:
+            await asyncio.sleep(1.0 / connect_rate)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    return stats, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='load generator for the Catcher room server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--rate', type=int, default=FPS, help='tick rate of the server')
+    parser.add_argument('--connect-rate', type=float, default=200.0, help='new connections per second')
+    args = parser.parse_args()
+
+    begin_time = time.perf_counter()
+    stats, failed = asyncio.run(generate(args.host, args.port, args.clients, args.rooms, args.duration,
+                                         args.connect_rate))
+    elapsed = time.perf_counter() - begin_time
+
+    gap = percentiles(stats.gaps, (50, 99, 100), scale=1000)
+    period = 1000.0 / args.rate
+
+    print('{} clients connected, {} failed, {} decode errors, {} inputs sent'.format(
+        stats.connected, failed, stats.errors, stats.inputs))
+    print('{:.0f} messages/s, {:.0f} KiB/s, {:.1%} keyframes, {:.1f} bytes per message'.format(
+        stats.messages / elapsed, stats.bytes / elapsed / 1024,
+        stats.keyframes / stats.messages if stats.messages else 0.0,
+        stats.bytes / stats.messages if stats.messages else 0.0))
+    print('message gap {:.2f}/{:.2f}/{:.2f} ms p50/p99/max for a {:.2f} ms tick'.format(
+        gap.get('p50', 0.0), gap.get('p99', 0.0), gap.get('max', 0.0), period))
+    return 0 if stats.connected and not failed and not stats.errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
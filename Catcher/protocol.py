@@ -0,0 +1,149 @@
+"""
+Catcher room protocol
+
+Messages go both ways over TCP as frames: a little-endian u16 length and a
+payload whose first byte is the message type, like binary WebSocket frames
+without the handshake.
+
+client -> server
+    'J' room:u32            join a room, the first client of a room plays
+    'I' direction:i8        -1 left, 0 stop, 1 right
+server -> client
+    'K' tick:u32 state      keyframe, the whole state
+    'D' tick:u32 changes    delta from the state of the previous message
+
+The state of a room is a list of ints: paddle x, score, missed, then the
+center x and y of every fruit. A keyframe holds the count and every value
+as a zigzag varint. A delta holds (unchanged values skipped, difference)
+varint pairs for the values that changed. Fruits only fall, so a delta is
+about two bytes per fruit. A delta needs the same number of values as the
+state before it, so a fruit caught or added makes the next message a
+keyframe.
+"""
+
+import os
+import struct
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gamekit import varint
+
+JOIN = b'J'
+INPUT = b'I'
+KEYFRAME = b'K'
+DELTA = b'D'
+
+_LENGTH = struct.Struct('<H')
+_TICK = struct.Struct('<I')
+
+
+def frame(payload):
+    return _LENGTH.pack(len(payload)) + payload
+
+
+async def read_frame(reader):
+    """the payload of the next frame, None at the end of the stream"""
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+        return await reader.readexactly(_LENGTH.unpack(header)[0])
+    except EOFError:
+        return None
+
+
+def join(room):
+    return frame(JOIN + _TICK.pack(room))
+
+
+def input_message(direction):
+    return frame(INPUT + struct.pack('<b', direction))
+
+
+def game_state(game):
+    """the state list of a Catcher"""
+    state = [game.paddle.rect.centerx, game.score, game.missed]
+    for fruit in game.fruits_group:
+        state.extend(fruit.rect.center)
+    return state
+
+
+def encode_keyframe(tick, state):
+    out = bytearray(KEYFRAME)
+    out += _TICK.pack(tick)
+    varint.put(out, len(state))
+    for value in state:
+        varint.put(out, varint.zigzag(value))
+    return frame(bytes(out))
+
+
+def encode_delta(tick, last, state):
+    out = bytearray(DELTA)
+    out += _TICK.pack(tick)
+    skipped = 0
+    for old, new in zip(last, state):
+        if old == new:
+            skipped += 1
+        else:
+            varint.put(out, skipped)
+            varint.put(out, varint.zigzag(new - old))
+            skipped = 0
+    return frame(bytes(out))
+
+
+class StateEncoder:
+    """the messages of one room, deltas from the last state sent"""
+
+    def __init__(self, keyframe_interval=0):
+        """
+        :param keyframe_interval: also send a keyframe every this many ticks, 0 only when needed
+        """
+        self.keyframe_interval = keyframe_interval
+        self.last = None
+        self.keyframes = 0
+        self.deltas = 0
+
+    def encode(self, tick, state):
+        """the message for the clients that got the last one"""
+        if (self.last is None or len(self.last) != len(state) or
+                (self.keyframe_interval and tick % self.keyframe_interval == 0)):
+            message = encode_keyframe(tick, state)
+            self.keyframes += 1
+        else:
+            message = encode_delta(tick, self.last, state)
+            self.deltas += 1
+        self.last = state
+        return message
+
+
+class StateDecoder:
+    """rebuilds the state of a room from the messages"""
+
+    def __init__(self):
+        self.tick = -1
+        self.state = None
+
+    def decode(self, payload):
+        kind = payload[:1]
+        tick = _TICK.unpack_from(payload, 1)[0]
+        pos = 1 + _TICK.size
+        if kind == KEYFRAME:
+            count, pos = varint.get(payload, pos)
+            state = []
+            for _ in range(count):
+                value, pos = varint.get(payload, pos)
+                state.append(varint.unzigzag(value))
+        elif kind == DELTA:
+            if self.state is None:
+                raise ValueError('delta before the first keyframe')
+            state = list(self.state)
+            index = 0
+            while pos < len(payload):
+                skipped, pos = varint.get(payload, pos)
+                change, pos = varint.get(payload, pos)
+                index += skipped
+                state[index] += varint.unzigzag(change)
+                index += 1
+        else:
+            raise ValueError('unknown message {!r}'.format(kind))
+        self.tick = tick
+        self.state = state
+        return state
@@ -0,0 +1,243 @@
+"""
+Headless Catcher room server
+
+Runs many independent Catcher games ("rooms") in one process, none of them
+drawn. Clients connect over TCP, join a room and send paddle inputs; one
+asyncio task ticks every room at a fixed rate and sends each room's clients
+its state, delta encoded (protocol.py). The first client of a room plays,
+the ones joining later watch and take over when it leaves. The server owns
+the game state; clients only send inputs.
+    python server.py --port 8765 --rooms 100
+    python loadgen.py --port 8765 --clients 200
+Every few seconds the server prints the number of rooms and clients, the
+time one tick of all rooms takes, how late the ticks start (jitter), and
+how many rooms one core could tick at the rate.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections import deque
+
+from Catcher import Catcher, WINDOWWIDTH, WINDOWHEIGHT, PADDLEWIDTH, PADDLEHEIGHT, PADDLECOLOR, FPS
+from gamekit.stats import percentiles
+import protocol
+
+PORT = 8765
+STATSINTERVAL = 5.0  # seconds between two lines of stats
+MAXBUFFER = 64 * 1024  # bytes queued for a client before it misses messages
+WINDOW = 600  # ticks kept for the percentiles
+
+
+class Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.room = None
+        self.needs_keyframe = True  # joined or missed a message
+        self.dropped = 0
+
+
+class Room:
+    def __init__(self, room_id, keep=False):
+        """
+        :param keep: keep the room when its last client leaves
+        """
+        self.room_id = room_id
+        self.keep = keep
+        self.game = Catcher(None, WINDOWWIDTH, WINDOWHEIGHT, PADDLEWIDTH, PADDLEHEIGHT, PADDLECOLOR)
+        self.encoder = protocol.StateEncoder()
+        self.clients = []
+        self.player = None
+
+    def add(self, client):
+        self.clients.append(client)
+        client.room = self
+        client.needs_keyframe = True
+        if self.player is None:
+            self.player = client
+
+    def remove(self, client):
+        self.clients.remove(client)
+        if self.player is client:
+            # the longest watching client plays on
+            self.player = self.clients[0] if self.clients else None
+            self.game.set_input(0)
+
+    def broadcast(self, tick):
+        """sends the state after this tick, returns the bytes queued"""
+        state = protocol.game_state(self.game)
+        message = self.encoder.encode(tick, state)
+        keyframe = None
+        sent = 0
+        for client in self.clients:
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > MAXBUFFER:
+                # too slow to keep up, skip it until it has caught up
+                client.dropped += 1
+                client.needs_keyframe = True
+                continue
+            if client.needs_keyframe:
+                if keyframe is None:
+                    keyframe = protocol.encode_keyframe(tick, state)
+                client.writer.write(keyframe)
+                client.needs_keyframe = False
+                sent += len(keyframe)
+            else:
+                client.writer.write(message)
+                sent += len(message)
+        return sent
+
+
+class CatcherServer:
+    def __init__(self, rate=FPS):
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.rooms = {}
+        self.clients = 0
+        self.tick = 0
+        self.late_ticks = 0  # ticks skipped because a tick took longer than the period
+        self.bytes_sent = 0
+        self.tick_times = deque(maxlen=WINDOW)  # seconds to tick and send every room
+        self.jitter = deque(maxlen=WINDOW)  # seconds a tick started after its time
+
+    def room(self, room_id, keep=False):
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = Room(room_id, keep)
+        return room
+
+    async def handle_client(self, reader, writer):
+        client = Client(writer)
+        self.clients += 1
+        try:
+            while True:
+                payload = await protocol.read_frame(reader)
+                if payload is None:
+                    break
+                kind = payload[:1]
+                if kind == protocol.JOIN and len(payload) == 5:
+                    if client.room is not None:
+                        self._leave(client)
+                    self.room(int.from_bytes(payload[1:5], 'little')).add(client)
+                elif kind == protocol.INPUT and len(payload) == 2:
+                    room = client.room
+                    if room is not None and room.player is client:
+                        room.game.set_input(int.from_bytes(payload[1:2], 'little', signed=True))
+                else:
+                    break  # not speaking the protocol
+        except ConnectionError:
+            pass
+        finally:
+            if client.room is not None:
+                self._leave(client)
+            self.clients -= 1
+            writer.close()
+
+    def _leave(self, client):
+        room = client.room
+        room.remove(client)
+        client.room = None
+        if not room.clients and not room.keep:
+            del self.rooms[room.room_id]
+
+    async def run(self):
+        """ticks every room at the fixed rate"""
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        while True:
+            now = loop.time()
+            if now < next_time:
+                await asyncio.sleep(next_time - now)
+                now = loop.time()
+            self.jitter.append(now - next_time)
+            self.step()
+            self.tick_times.append(loop.time() - now)
+            next_time += self.period
+            behind = loop.time() - next_time
+            if behind > self.period:
+                # drop the ticks we can't catch up instead of running them back to back
+                skipped = int(behind / self.period)
+                self.late_ticks += skipped
+                next_time += skipped * self.period
+
+    def step(self):
+        self.tick += 1
+        sent = 0
+        for room in list(self.rooms.values()):
+            room.game.update()
+            if room.clients:
+                sent += room.broadcast(self.tick)
+        self.bytes_sent += sent
+
+    def stats(self):
+        tick_ms = percentiles(self.tick_times, (50, 99), scale=1000)
+        jitter_ms = percentiles(self.jitter, (50, 99), scale=1000)
+        tick_time = sum(self.tick_times) / len(self.tick_times) if self.tick_times else 0.0
+        rooms = len(self.rooms)
+        return {
+            'rooms': rooms,
+            'clients': self.clients,
+            'tick': self.tick,
+            'tick_ms_p50': tick_ms.get('p50', 0.0),
+            'tick_ms_p99': tick_ms.get('p99', 0.0),
+            'jitter_ms_p50': jitter_ms.get('p50', 0.0),
+            'jitter_ms_p99': jitter_ms.get('p99', 0.0),
+            'late_ticks': self.late_ticks,
+            # rooms one core could tick at the rate, from the mean time per room
+            'rooms_per_core': int(rooms * self.period / tick_time) if rooms and tick_time else 0,
+        }
+
+    async def report(self, interval=STATSINTERVAL):
+        last_bytes, last_time = self.bytes_sent, time.perf_counter()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            stats = self.stats()
+            stats['kbytes_per_s'] = (self.bytes_sent - last_bytes) / (now - last_time) / 1024
+            last_bytes, last_time = self.bytes_sent, now
+            print('{rooms} rooms {clients} clients | tick {tick_ms_p50:.2f}/{tick_ms_p99:.2f} ms p50/p99 | '
+                  'jitter {jitter_ms_p50:.2f}/{jitter_ms_p99:.2f} ms | {late_ticks} late | '
+                  '{kbytes_per_s:.0f} KiB/s | ~{rooms_per_core} rooms/core'.format(**stats), flush=True)
+
+
+async def serve(host, port, rate, rooms=0, duration=None):
+    server = CatcherServer(rate)
+    for room_id in range(rooms):
+        server.room(room_id, keep=True)
+    tcp = await asyncio.start_server(server.handle_client, host, port)
+    print('serving on {}:{} at {} ticks/s'.format(host, port, rate), flush=True)
+    tasks = [asyncio.ensure_future(server.run()), asyncio.ensure_future(server.report())]
+    try:
+        async with tcp:
+            if duration:
+                await asyncio.sleep(duration)
+            else:
+                await tcp.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='headless Catcher room server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--rate', type=int, default=FPS, help='ticks per second')
+    parser.add_argument('--rooms', type=int, default=0,
+                        help='rooms to create up front and keep, ids 0 to ROOMS-1')
+    parser.add_argument('--duration', type=float, help='stop after this many seconds')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.rate, args.rooms, args.duration))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,47 @@
+import os
 import sys
+import time
+import argparse
 import pygame
 import random
 from pygame.locals import *
 from itertools import cycle
 
-FPS = 30
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gamekit import audio, capture, profiler, startup, text
+from gamekit.idle import IdleWait
+from gamekit.loader import AssetLoader
+from assets import AssetRegistry, PendingSound, load_image
+from dirty import DirtyScreen
+from timestep import FixedStep, lerp
+from replay import Replay
+import atlas
+
+FPS = 30  # 模拟速度, steps per second of the game logic
+RENDER_FPS = None  # 绘制帧率, None draws once per step
+MAXSTEPS = 5  # most steps caught up in one frame
+IDLEAFTER = 10.0  # 多少秒没有输入后欢迎和结束画面停止动画, None never stops
+AUTOPILOT = False  # 自动驾驶 (autopilot.py) plays every round, attract mode
+GHOSTS = None  # ghosts.GhostTracks of earlier runs flying along
+PIPECAPACITY = 4  # 同时存在的柱子对数上限, at most 3 are on the screen
+GAMEDIR = os.path.dirname(os.path.abspath(__file__))  # res/ is found from here, not the working directory
 SCREENWIDTH = 288
 SCREENHEIGHT = 512
+PROGRESSHEIGHT = 4  # 加载进度条
+PROGRESSCOLOR = (255, 255, 255)
 
 PIPEGAPSIZE = 100
 BASEY = 0.79 * SCREENHEIGHT
 
-IMAGES, SOUNDS, HITMASKS = {}, {}, {}
+IMAGES = {}
+ASSETS = AssetRegistry()
+ATLAS = None  # 打包的图片 (atlas.py), None decodes the PNG files
+LOADER = None  # AssetLoader decoding ASSETS in the background
+PROFILER = profiler.NullProfiler()
+CAPTURE = capture.NullCapture()  # 录像, F9 saves a highlight
+AUDIO = None  # audio.SoundBoard playing the sounds
+SCORE_LAYOUTS = text.LRUCache(64)  # score -> blits of its digits
+PIPE_RANDOM = random.Random()  # 柱子的随机数, seeded every round so it can be replayed
 
 # list of all possible players (tuple of 3 positions of flap)
 PLAYERS_LIST = (
@@ -44,20 +74,68 @@ PIPES_LIST = (
     'res/images/pipe-green.png',
     'res/images/pipe-red.png',
 )
+# sound -> category, res/audio/<name>.wav on Windows and .ogg elsewhere
+SOUNDS = {'die': 'crash', 'hit': 'crash', 'point': 'score', 'swoosh': 'screen', 'wing': 'flap'}
+# 每类声音预留的通道数, a third flap within a flap cuts off the oldest
+SOUND_CHANNELS = {'flap': 2, 'score': 1, 'crash': 2, 'screen': 1}
+# digits of the score
+NUMBERS_LIST = tuple('res/images/{}.png'.format(i) for i in range(10))
+# the other images, by their key in ASSETS
+SPRITES = {
+    'gameover': 'res/images/gameover.png',
+    'message': 'res/images/message.png',
+    'base': 'res/images/base.png',
+}
+
+
+class BirdFrames:
+    """rotated images and masks of one bird skin, shared by every bird using it"""
+    ANGLE_STEP = 3  # 角度量化, same as Bird.vel_rotate
+    MIN_ANGLE = -96  # rotation stops below -90, a crashed bird turns 7 at a time
+    MAX_ANGLE = 20  # Bird.rotation_threshold
+
+    def __init__(self, images, masks=None):
+        """
+        :param masks: collision masks of the images, None makes them from the images
+        """
+        self.images = tuple(images)
+        self.masks = tuple(masks or (pygame.mask.from_surface(image) for image in self.images))
+        self._rotated = {}
+        # every angle quantize() gives, a climbing bird is drawn at MAX_ANGLE
+        angles = list(range(self.MIN_ANGLE, self.MAX_ANGLE, self.ANGLE_STEP)) + [self.MAX_ANGLE]
+        for index in range(len(self.images)):
+            for angle in angles:
+                self.rotated(index, angle)
+
+    def quantize(self, angle):
+        """the nearest multiple of ANGLE_STEP, MIN_ANGLE to MAX_ANGLE"""
+        angle = int(round(angle / self.ANGLE_STEP)) * self.ANGLE_STEP
+        return max(self.MIN_ANGLE, min(angle, self.MAX_ANGLE))
+
+    def rotated(self, index, angle):
+        """image index rotated by angle, built only the first time"""
+        key = (index, self.quantize(angle))
+        image = self._rotated.get(key)
+        if image is None:
+            image = self._rotated[key] = pygame.transform.rotate(self.images[index], key[1])
+        return image
 
 
 class Bird(pygame.sprite.Sprite):
-    def __init__(self, images, x, y):
+    def __init__(self, images, x, y, frames=None):
         pygame.sprite.Sprite.__init__(self)
-        self._img_list = images
+        self._frames = frames or BirdFrames(images)
+        self._img_list = self._frames.images
         self._img_index = 0
         self._img_index_gen = cycle([0, 1, 2, 1])
         self._loop_iter = 0
+        self.anim_steps = 0  # animate() calls so far
         self.image = self._img_list[self._img_index]
         self.rect = self.image.get_rect()
         self.rect.left = x
         self.rect.top = y
-        self.mask = pygame.mask.from_surface(self.image)
+        self.last_top = y  # top before the last step, for interpolation
+        self.mask = self._frames.masks[self._img_index]
 
         self._hover_vals = {'val': 0, 'dir': 1}
 
@@ -76,20 +154,31 @@ class Bird(pygame.sprite.Sprite):
         if abs(self._hover_vals['val']) == 8:
             self._hover_vals['dir'] *= -1
         self._hover_vals['val'] += self._hover_vals['dir']
+        self.last_top = self.rect.top
         self.rect.top += self._hover_vals['dir']
 
-    def draw(self, surface, flying=False):
+    def animate(self):
+        """扇动翅膀, next image every 5 steps"""
         if (self._loop_iter+1) % 5 == 0:
             self._img_index = next(self._img_index_gen)
             self.image = self._img_list[self._img_index]
-            self.mask = pygame.mask.from_surface(self.image)
+            self.mask = self._frames.masks[self._img_index]
         self._loop_iter = (self._loop_iter + 1) % 30
+        self.anim_steps += 1
+
+    def draw(self, surface, flying=False):
+        self.animate()
+        self.blit(surface, flying)
+
+    def blit(self, surface, flying=False, alpha=1.0):
+        """draws the current image, alpha interpolates from the last step's position"""
+        pos = (self.rect.left, lerp(self.last_top, self.rect.top, alpha))
         if not flying:
-            surface.blit(self.image, self.rect)
+            surface.blit(self.image, pos)
         else:
             visible_rot = min(self.rotation, self.rotation_threshold)
-            show_image = pygame.transform.rotate(self.image, visible_rot)
-            surface.blit(show_image, self.rect)
+            show_image = self._frames.rotated(self._img_index, visible_rot)
+            surface.blit(show_image, pos)
 
     def flap_once(self):
         self.velocity_y = self.flap_acceleration
@@ -111,228 +200,533 @@ class Bird(pygame.sprite.Sprite):
             self.rotation -= self.vel_rotate
         if self.velocity_y < self.max_vel_y:
             self.velocity_y += self.acceleration_y
+        self.last_top = self.rect.top
         if self.rect.top + self.rect.height < BASEY - 1:
             self.rect.top += min(self.velocity_y, BASEY - self.rect.top - self.rect.height)
 
 
 class Pipe(pygame.sprite.Sprite):
-    def __init__(self, image, x, y):
+    def __init__(self, image, x, y, mask=None):
         pygame.sprite.Sprite.__init__(self)
         self.image = image
         self.rect = self.image.get_rect()
         self.rect.left = x
         self.rect.top = y
-        self.mask = pygame.mask.from_surface(self.image)
+        self.last_left = x  # left before the last step, for interpolation
+        self.mask = mask or pygame.mask.from_surface(self.image)
         self.velocity = -4
 
+    def reset(self, image, mask):
+        self.image = image
+        self.mask = mask
+        self.rect.size = image.get_size()
+
+    def place(self, x, y):
+        self.rect.topleft = (x, y)
+        self.last_left = x
+
     def update(self):
+        self.last_left = self.rect.left
         self.rect.left += self.velocity
 
 
-def main():
-    global FPSCLOCK, SCREEN
-    # init pygame
-    pygame.init()
+class PipeRing:
+    """
+    fixed number of pipe pairs, reused in a ring from the oldest to the newest
+    pipes are counted from the start of the round, pair n lives in slot n % capacity
+    """
+
+    def __init__(self, capacity=PIPECAPACITY):
+        self.capacity = capacity
+        self._upper = []
+        self._lower = []
+        self._first = 0  # oldest pair
+        self._end = 0  # one past the newest pair
+        self._next = 0  # first pair the bird has not passed
+
+    def reset(self, images, masks):
+        """empties the ring, the pairs use the upper and lower images and masks"""
+        if not self._upper:
+            self._upper = [Pipe(images[0], 0, 0, masks[0]) for _ in range(self.capacity)]
+            self._lower = [Pipe(images[1], 0, 0, masks[1]) for _ in range(self.capacity)]
+        for upper, lower in zip(self._upper, self._lower):
+            upper.reset(images[0], masks[0])
+            lower.reset(images[1], masks[1])
+        self._first = self._end = self._next = 0
+
+    def __len__(self):
+        return self._end - self._first
+
+    def __iter__(self):
+        for n in range(self._first, self._end):
+            yield self._upper[n % self.capacity], self._lower[n % self.capacity]
+
+    def add(self, x, gap_y):
+        """places a pair with the gap between gap_y and gap_y + PIPEGAPSIZE"""
+        if len(self) == self.capacity:
+            raise RuntimeError('more than {} pipe pairs'.format(self.capacity))
+        slot = self._end % self.capacity
+        upper, lower = self._upper[slot], self._lower[slot]
+        upper.place(x, gap_y - upper.rect.height)
+        lower.place(x, gap_y + PIPEGAPSIZE)
+        self._end += 1
+
+    def first(self):
+        return self._upper[self._first % self.capacity], self._lower[self._first % self.capacity]
+
+    def remove_first(self):
+        self._first += 1
+        self._next = max(self._next, self._first)
+
+    def near(self, rect):
+        """pairs overlapping the columns of rect, rect only moves right relative to the pipes"""
+        while self._next < self._end and self._upper[self._next % self.capacity].rect.right <= rect.left:
+            self._next += 1
+        for n in range(self._next, self._end):
+            upper = self._upper[n % self.capacity]
+            if upper.rect.left >= rect.right:
+                break
+            yield upper, self._lower[n % self.capacity]
+
+    def upper_pipes(self):
+        for n in range(self._first, self._end):
+            yield self._upper[n % self.capacity]
+
+    def lower_pipes(self):
+        for n in range(self._first, self._end):
+            yield self._lower[n % self.capacity]
+
+    def update(self):
+        for n in range(self._first, self._end):
+            self._upper[n % self.capacity].update()
+            self._lower[n % self.capacity].update()
+
+
+def main(dirty_rects=False, render_fps=None, max_steps=MAXSTEPS, replay_dir=None, frame_profiler=None,
+         idle_after=IDLEAFTER, frame_capture=None, loose_assets=False, sound_board=None, autopilot=False,
+         ghost_tracks=None):
+    """
+    :param dirty_rects: only redraw and update the regions that changed
+    :param render_fps: draw at this frame rate, interpolating between the
+                       fixed steps of the game logic
+    :param max_steps: most steps caught up after a slow frame
+    :param replay_dir: save the replay of every run into this directory
+    :param frame_profiler: times the phases of the main game frames
+    :param idle_after: seconds without input before the welcome and game over
+                       screens stop and wait for events, None keeps them animating
+    :param frame_capture: records the frames shown
+    :param loose_assets: decode the image files even if there is an atlas
+    :param sound_board: audio.SoundBoard with SOUND_CHANNELS, made before the mixer starts
+    :param autopilot: the autopilot plays, rounds start and restart by themselves
+    :param ghost_tracks: ghosts.GhostTracks drawn along every round
+    """
+    global FPSCLOCK, SCREEN, RENDER_FPS, MAXSTEPS, PROFILER, IDLEAFTER, CAPTURE, ATLAS, LOADER, AUDIO, AUTOPILOT, GHOSTS
+    RENDER_FPS, MAXSTEPS, IDLEAFTER, AUTOPILOT = render_fps, max_steps, idle_after, autopilot
+    GHOSTS = ghost_tracks
+    PROFILER = frame_profiler or profiler.NullProfiler()
+    CAPTURE = frame_capture or capture.NullCapture()
+    if sound_board is None:
+        audio.pre_init()
+        sound_board = audio.SoundBoard(SOUND_CHANNELS)
+    AUDIO = sound_board
+    # init pygame, only the subsystems the game uses
+    startup.init('display', 'mixer')
     FPSCLOCK = pygame.time.Clock()
     SCREEN = pygame.display.set_mode((SCREENWIDTH, SCREENHEIGHT))
+    if dirty_rects:
+        SCREEN = DirtyScreen(SCREEN)
     pygame.display.set_caption("Flappy Bird")
-    icon = pygame.image.load('flappy.ico').convert_alpha()
+    icon = pygame.image.load(res_path('flappy.ico')).convert_alpha()
     pygame.display.set_icon(icon)
 
-    # numbers sprites for score display
-    IMAGES['numbers'] = (
-        pygame.image.load('res/images/0.png').convert_alpha(),
-        pygame.image.load('res/images/1.png').convert_alpha(),
-        pygame.image.load('res/images/2.png').convert_alpha(),
-        pygame.image.load('res/images/3.png').convert_alpha(),
-        pygame.image.load('res/images/4.png').convert_alpha(),
-        pygame.image.load('res/images/5.png').convert_alpha(),
-        pygame.image.load('res/images/6.png').convert_alpha(),
-        pygame.image.load('res/images/7.png').convert_alpha(),
-        pygame.image.load('res/images/8.png').convert_alpha(),
-        pygame.image.load('res/images/9.png').convert_alpha()
-    )
-    # game over sprite
-    IMAGES['gameover'] = pygame.image.load('res/images/gameover.png').convert_alpha()
-    # message sprite for welcome screen
-    IMAGES['message'] = pygame.image.load('res/images/message.png').convert_alpha()
-    # base (ground) sprite
-    IMAGES['base'] = pygame.image.load('res/images/base.png').convert_alpha()
-
-    # sounds
-    if 'win' in sys.platform:
-        soundExt = '.wav'
-    else:
-        soundExt = '.ogg'
-
-    SOUNDS['die'] = pygame.mixer.Sound('res/audio/die' + soundExt)
-    SOUNDS['hit'] = pygame.mixer.Sound('res/audio/hit' + soundExt)
-    SOUNDS['point'] = pygame.mixer.Sound('res/audio/point' + soundExt)
-    SOUNDS['swoosh'] = pygame.mixer.Sound('res/audio/swoosh' + soundExt)
-    SOUNDS['wing'] = pygame.mixer.Sound('res/audio/wing' + soundExt)
+    # decode every image variant and sound once, on the loader thread:
+    # the sounds first, then the images of the rounds, the other skins last
+    startup.phase('assets')
+    ATLAS = None if loose_assets else atlas.load(res_path(atlas.ATLASPATH))
+    register_assets()
+    register_sounds()
+    if GHOSTS is not None:
+        register_ghosts()
+    LOADER = AssetLoader()
+    ASSETS.load_async(LOADER, priority=3)
+    ASSETS.load_async(LOADER, [('sound', name) for name in SOUNDS], priority=1)
+    startup.phase('first frame')
+
+    # the pipe pairs are reused from round to round
+    pipes = PipeRing(PIPECAPACITY)
 
     while True:
         # 选择背景
         randBg = random.randint(0, len(BACKGROUNDS_LIST)-1)
-        IMAGES['background'] = pygame.image.load(BACKGROUNDS_LIST[randBg]).convert()
         # 随机选择小鸟图案
         randPlayer = random.randint(0, len(PLAYERS_LIST)-1)
-        IMAGES['player'] = (
-            pygame.image.load(PLAYERS_LIST[randPlayer][0]).convert_alpha(),
-            pygame.image.load(PLAYERS_LIST[randPlayer][1]).convert_alpha(),
-            pygame.image.load(PLAYERS_LIST[randPlayer][2]).convert_alpha(),
-        )
+        # 随机选择柱子图案, upper pipe is the lower one rotated 180
+        pipeindex = random.randint(0, len(PIPES_LIST) - 1)
+
+        # 欢迎画面的图片最先加载, the rest of the round loads behind the welcome screen
+        # the masks and rotated frames of them are built on this thread, once they are decoded
+        welcome_keys = [('background', randBg), ('player', randPlayer), 'message', 'base']
+        round_keys = ['numbers', 'gameover', ('pipe', pipeindex)]
+        ASSETS.load_async(LOADER, welcome_keys, priority=0)
+        ASSETS.load_async(LOADER, round_keys, priority=2)
+        show_loading_screen(welcome_keys)
+
+        IMAGES['background'] = ASSETS['background', randBg]
+        IMAGES['player'] = ASSETS['player', randPlayer]
+        # message sprite for welcome screen
+        IMAGES['message'] = ASSETS['message']
+        # base (ground) sprite
+        IMAGES['base'] = ASSETS['base']
         # 小鸟的初始位置
         playerx = int(SCREENWIDTH * 0.2)
         playery = int((SCREENHEIGHT - IMAGES['player'][0].get_height()) / 2)
-        player = Bird(IMAGES['player'], playerx, playery)
+        player = Bird(IMAGES['player'], playerx, playery, ASSETS['player_frames', randPlayer])
 
-        # 随机选择柱子图案
-        pipeindex = random.randint(0, len(PIPES_LIST) - 1)
-        IMAGES['pipe'] = (
-            pygame.transform.rotate(
-                pygame.image.load(PIPES_LIST[pipeindex]).convert_alpha(), 180),
-            pygame.image.load(PIPES_LIST[pipeindex]).convert_alpha(),
-        )
-
-        # hit mask for pipes
-        HITMASKS['pipe'] = (
-            getHitmask(IMAGES['pipe'][0]),
-            getHitmask(IMAGES['pipe'][1]),
-        )
-
-        # hit mask for player
-        HITMASKS['player'] = (
-            getHitmask(IMAGES['player'][0]),
-            getHitmask(IMAGES['player'][1]),
-            getHitmask(IMAGES['player'][2]),
-        )
-
-        # show welcome screen
-        movement_info = show_welcome_animation(player)
+        # show welcome screen, it starts the round once round_keys are loaded
+        movement_info = show_welcome_animation(player, round_keys)
+
+        # numbers sprites for score display
+        IMAGES['numbers'] = ASSETS['numbers']
+        # game over sprite
+        IMAGES['gameover'] = ASSETS['gameover']
+        IMAGES['pipe'] = ASSETS['pipe', pipeindex]
+
+        pipes.reset(IMAGES['pipe'], ASSETS['pipe_masks', pipeindex])
+
+        pilot = None
+        if AUTOPILOT:
+            import autopilot
+            pilot = autopilot.Autopilot(*autopilot.load_hitmasks(randPlayer, pipeindex))
 
         # main game loop
-        crash_info = main_game(movement_info, player)
+        ghost_frames = ASSETS['ghost_frames', randPlayer] if GHOSTS is not None else None
+        crash_info = main_game(movement_info, player, pipes, pilot, ghost_frames, (randPlayer, pipeindex))
+        if replay_dir:
+            crash_info['replay'].save(os.path.join(
+                replay_dir, '{}-{:08x}.fbr'.format(int(time.time()), crash_info['replay'].seed)))
 
         # game over screen
         showGameOverScreen(crash_info, player)
 
 
-def show_welcome_animation(player):
+def res_path(path):
+    """path of a file of the game, the paths in the lists are relative to GAMEDIR"""
+    return os.path.join(GAMEDIR, path)
+
+
+def load_sprite(path, alpha=True):
+    """an image from the atlas, or decoded from its file without one"""
+    if ATLAS is not None:
+        return ATLAS.image(path)
+    return load_image(res_path(path), alpha)
+
+
+def load_images(paths):
+    return tuple(load_sprite(path) for path in paths)
+
+
+def load_pipes(path):
+    """returns the upper and lower pipe, the upper one is the image rotated 180"""
+    if ATLAS is not None:
+        return ATLAS.image(atlas.ROTATED.format(path)), ATLAS.image(path)
+    image = load_sprite(path)
+    return pygame.transform.rotate(image, 180), image
+
+
+def load_masks(paths):
+    """collision masks of atlas sprites, read from the atlas file instead of the sheet being drawn"""
+    return tuple(ATLAS.hitmask(path).to_mask() for path in paths)
+
+
+def register_assets():
+    """
+    registers the images of all skins, backgrounds and pipes in ASSETS
+    decoding goes to the loader, rotations and masks of the images are built
+    where they are drawn (assets.py); with the atlas the masks are read from
+    its file instead
+    """
+    # atlas sprites are subsurfaces of the one sheet every sprite is drawn from
+    decoded = ATLAS is None
+    ASSETS.register('numbers', load_images, NUMBERS_LIST, background=decoded)
+    for key, path in SPRITES.items():
+        ASSETS.register(key, load_sprite, path, background=decoded)
+
+    for i, path in enumerate(BACKGROUNDS_LIST):
+        ASSETS.register(('background', i), load_sprite, path, False, background=decoded)
+
+    for i, paths in enumerate(PLAYERS_LIST):
+        ASSETS.register(('player', i), load_images, paths, background=decoded)
+        ASSETS.register(('player_frames', i), lambda i=i: BirdFrames(
+            ASSETS['player', i], None if decoded else load_masks(PLAYERS_LIST[i])), background=False)
+
+    for i, path in enumerate(PIPES_LIST):
+        ASSETS.register(('pipe', i), load_pipes, path, background=decoded)
+        if decoded:
+            ASSETS.register(('pipe_masks', i), lambda i=i: tuple(
+                pygame.mask.from_surface(image) for image in ASSETS['pipe', i]), background=False)
+        else:
+            ASSETS.register(('pipe_masks', i), load_masks, (atlas.ROTATED.format(path), path))
+
+
+def register_sounds():
+    """registers the sounds in ASSETS, AUDIO plays them once they are loaded"""
+    if 'win' in sys.platform:
+        soundExt = '.wav'
+    else:
+        soundExt = '.ogg'
+    for name, category in SOUNDS.items():
+        ASSETS.register(('sound', name), pygame.mixer.Sound, res_path('res/audio/' + name + soundExt))
+        AUDIO.add(name, category, PendingSound(ASSETS, ('sound', name)).get)
+
+
+def register_ghosts():
+    """registers the see-through bird images of every skin the ghosts are drawn with"""
+    import ghosts
+    for i in range(len(PLAYERS_LIST)):
+        ASSETS.register(('ghost_frames', i), lambda i=i: ghosts.GhostFrames(ASSETS['player_frames', i]),
+                        background=False)
+
+
+def show_loading_screen(keys):
+    """shows the loading progress until the assets of keys are loaded, nothing if they are"""
+    while not ASSETS.ready(keys):
+        for event in pygame.event.get():
+            if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                pygame.quit()
+                sys.exit()
+        pygame.display.get_surface().fill((0, 0, 0))
+        draw_progress()
+        if isinstance(SCREEN, DirtyScreen):
+            SCREEN.invalidate()
+        update_display()
+        FPSCLOCK.tick(FPS)
+
+
+def draw_progress():
+    """a bar at the bottom of the screen, filled as far as ASSETS are loaded"""
+    bar = pygame.Surface((SCREENWIDTH, PROGRESSHEIGHT))
+    bar.fill(PROGRESSCOLOR, (0, 0, int(SCREENWIDTH * ASSETS.progress()), PROGRESSHEIGHT))
+    SCREEN.blit(bar, (0, SCREENHEIGHT - PROGRESSHEIGHT))
+
+
+def show_welcome_animation(player, round_keys=()):
+    """
+    :param round_keys: assets the round needs, space starts the round once they are loaded
+    """
     # 欢迎消息的位置
     messagex = int((SCREENWIDTH - IMAGES['message'].get_width()) / 2)
     messagey = int(SCREENHEIGHT * 0.12)
 
     # base的初始位置及可以向左移动的最大距离
-    basex = 0
+    basex = lastBasex = 0
     baseShift = IMAGES['base'].get_width() - IMAGES['background'].get_width()
 
+    timestep = FixedStep(FPSCLOCK, FPS, RENDER_FPS, MAXSTEPS)
+    idle = IdleWait(IDLEAFTER)
+    start = None  # 按下空格的时间
     while True:
-        for event in pygame.event.get():
+        for event in idle.poll():
             if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
                 pygame.quit()
                 sys.exit()
             elif event.type == KEYDOWN and event.key == K_SPACE:
-                # start game, quit welcome screen
-                SOUNDS['wing'].play()
-                return {'basex': basex}
-
-        # adjust basex
-        basex = -((-basex + 4) % baseShift)  # base向左移动4
-        # 小鸟上下飞动
-        player.hover()
+                if start is None:
+                    start = time.perf_counter()
+            elif event.type == KEYDOWN and event.key == K_F9:
+                CAPTURE.save_highlight()
+
+        if AUTOPILOT and start is None:
+            start = time.perf_counter()
+        if start is not None and ASSETS.ready(round_keys):
+            # start game, quit welcome screen
+            AUDIO.play('wing', start)
+            return {'basex': basex}
+
+        if idle.idle:
+            # 没人玩，画面停住，等待输入
+            show_idle_screen(idle)
+            continue
+        if idle.woke:
+            timestep.reset()
+        for _ in range(timestep.tick()):
+            # adjust basex
+            lastBasex = basex
+            basex = -((-basex + 4) % baseShift)  # base向左移动4
+            # 小鸟上下飞动
+            player.hover()
+            player.animate()
 
         # draw sprites
-        SCREEN.blit(IMAGES['background'], (0, 0))
-        player.draw(SCREEN)
+        draw_background()
+        player.blit(SCREEN, alpha=timestep.alpha)
         SCREEN.blit(IMAGES['message'], (messagex, messagey))
-        SCREEN.blit(IMAGES['base'], (basex, BASEY))
+        SCREEN.blit(IMAGES['base'], (base_position(lastBasex, basex, baseShift, timestep.alpha), BASEY))
+        if not LOADER.done():
+            draw_progress()
 
-        pygame.display.update()
-        FPSCLOCK.tick(FPS)
+        update_display()
 
 
-def main_game(movement_info, player):
+def main_game(movement_info, player, pipes, pilot=None, ghost_frames=None, skin=(0, 0)):
+    """
+    :param pilot: autopilot.Autopilot deciding the flaps instead of the space key
+    :param ghost_frames: ghosts.GhostFrames to draw GHOSTS with
+    :param skin: (PLAYERS_LIST, PIPES_LIST) indexes of the images, kept in the replay for their masks
+    """
     score = 0
-    basex = movement_info['basex']
+    basex = lastBasex = movement_info['basex']
     base_shift = IMAGES['base'].get_width() - IMAGES['background'].get_width()
 
-    upper_pipes_group = pygame.sprite.Group()
-    lower_pipes_group = pygame.sprite.Group()
+    # 记录本局, the pipes come from the seed and the rest from the flaps
+    seed = random.getrandbits(32)
+    PIPE_RANDOM.seed(seed)
+    replay = Replay(seed, player.rect.top, player.anim_steps, player_index=skin[0], pipe_index=skin[1])
+    step = 0
 
-    # get 2 new pipes to add to upperPipes lowerPipes list
-    get_random_pipes(upper_pipes_group, lower_pipes_group, SCREENWIDTH + 200)
-    get_random_pipes(upper_pipes_group, lower_pipes_group, SCREENWIDTH + 200 + SCREENWIDTH // 2)
+    # get 2 new pipes to add to the ring
+    get_random_pipes(pipes, SCREENWIDTH + 200)
+    get_random_pipes(pipes, SCREENWIDTH + 200 + SCREENWIDTH // 2)
 
 
+    timestep = FixedStep(FPSCLOCK, FPS, RENDER_FPS, MAXSTEPS)
+    flap = None  # time of the first flap since the last step
     while True:
+        PROFILER.begin_frame()
+        PROFILER.phase('event')
         for event in pygame.event.get():
             if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                PROFILER.end_frame()
                 pygame.quit()
                 sys.exit()
             elif event.type == KEYDOWN and event.key == K_SPACE:
+                if flap is None:
+                    flap = time.perf_counter()
+            elif event.type == KEYDOWN and event.key == K_F9:
+                CAPTURE.save_highlight()
+
+        PROFILER.phase('tick')
+        for _ in range(timestep.tick()):
+            PROFILER.phase('update')
+            if pilot is not None:
+                flap = None
+                if pilot.decide(step, player.rect.top, player.velocity_y,
+                                ((upper.rect.left, lower.rect.top - PIPEGAPSIZE) for upper, lower in pipes),
+                                player.anim_steps):
+                    flap = time.perf_counter()
+            # the flap is taken by the next step
+            if flap is not None:
+                replay.flap(step)
                 if player.rect.y > -2 * IMAGES['player'][0].get_height():
                     player.flap_once()
-                    SOUNDS['wing'].play()
-
-        # check for crash
-        crashTest = check_crash(player, upper_pipes_group, lower_pipes_group)
-        if crashTest[0]:
-            player.crash()
-            return {
-                'groundCrash': crashTest[1],
-                'basex': basex,
-                'upperPipes': upper_pipes_group,
-                'lowerPipes': lower_pipes_group,
-                'score': score,
-            }
-
-        # check for scores, 再pipe中点及之后4个距离内加1分，4应该是移动的速度
-        playerMidPos = player.rect.x + IMAGES['player'][0].get_width() / 2
-        for pipe in upper_pipes_group:
-            pipeMidPos = pipe.rect.x + IMAGES['pipe'][0].get_width() / 2
-            if pipeMidPos <= playerMidPos < pipeMidPos + 4:
-                score += 1
-                SOUNDS['point'].play()
-
-        basex = -((-basex + 100) % base_shift)
-
-        # move pipes to left
-
-        # add new pipe when first pipe is about to touch left of screen
-        upper_pipes_list = upper_pipes_group.sprites()
-        if 0 < upper_pipes_list[0].rect.left < 5:
-            get_random_pipes(upper_pipes_group, lower_pipes_group, SCREENWIDTH + 10)
-
-        # remove first pipe if its out of the screen
-        upper_pipes_list = upper_pipes_group.sprites()
-        lower_pipes_list = lower_pipes_group.sprites()
-        if upper_pipes_list[0].rect.left < -IMAGES['pipe'][0].get_width():
-            upper_pipes_list[0].remove(upper_pipes_group)
-            lower_pipes_list[0].remove(lower_pipes_group)
-
-        player.update()
-        upper_pipes_group.update()
-        lower_pipes_group.update()
+                    AUDIO.play('wing', flap)
+            flap = None
+
+            # check for crash
+            PROFILER.phase('collision')
+            crashTest = check_crash(player, pipes)
+            PROFILER.phase('update')
+            if crashTest[0]:
+                PROFILER.end_frame()
+                player.crash()
+                replay.finish(score, step)
+                return {
+                    'groundCrash': crashTest[1],
+                    'basex': basex,
+                    'pipes': pipes,
+                    'score': score,
+                    'replay': replay,
+                }
+
+            # check for scores, 再pipe中点及之后4个距离内加1分，4应该是移动的速度
+            playerMidPos = player.rect.x + IMAGES['player'][0].get_width() / 2
+            for pipe, _ in pipes.near(player.rect):
+                pipeMidPos = pipe.rect.x + IMAGES['pipe'][0].get_width() / 2
+                if pipeMidPos <= playerMidPos < pipeMidPos + 4:
+                    score += 1
+                    AUDIO.play('point')
+
+            lastBasex = basex
+            basex = -((-basex + 100) % base_shift)
+
+            # move pipes to left
+
+            # add new pipe when first pipe is about to touch left of screen
+            first_pipe = pipes.first()[0]
+            if 0 < first_pipe.rect.left < 5:
+                get_random_pipes(pipes, SCREENWIDTH + 10)
+
+            # remove first pipe if its out of the screen
+            if first_pipe.rect.left < -IMAGES['pipe'][0].get_width():
+                pipes.remove_first()
+
+            player.update()
+            pipes.update()
+            player.animate()
+            step += 1
+
+        # draw sprites, in between the last two steps
+        PROFILER.phase('draw')
+        draw_background()
+
+        draw_pipes(pipes.upper_pipes(), timestep.alpha)
+        draw_pipes(pipes.lower_pipes(), timestep.alpha)
+
+        SCREEN.blit(IMAGES['base'], (base_position(lastBasex, basex, base_shift, timestep.alpha), BASEY))
+        # print score so player overlaps the score
+        showScore(score)
 
-        # draw sprites
+        if ghost_frames is not None:
+            GHOSTS.draw(SCREEN, ghost_frames, step, timestep.alpha)
+        player.blit(SCREEN, True, timestep.alpha)
+        PROFILER.draw_hud(SCREEN)
+
+        PROFILER.phase('flip')
+        update_display()
+        PROFILER.end_frame()
+
+
+def draw_pipes(pipes, alpha=1.0):
+    for pipe in pipes:
+        SCREEN.blit(pipe.image, (lerp(pipe.last_left, pipe.rect.left, alpha), pipe.rect.top))
+
+
+def base_position(last_basex, basex, base_shift, alpha=1.0):
+    """x of the base between the last two steps, wrapped the same way as basex"""
+    moved = (last_basex - basex) % base_shift
+    return -((-last_basex + moved * alpha) % base_shift)
+
+
+def draw_background():
+    """draws the background, only over the last frame's sprites in dirty rect mode"""
+    if isinstance(SCREEN, DirtyScreen):
+        SCREEN.clear(IMAGES['background'])
+    else:
         SCREEN.blit(IMAGES['background'], (0, 0))
 
-        upper_pipes_group.draw(SCREEN)
-        lower_pipes_group.draw(SCREEN)
 
-        SCREEN.blit(IMAGES['base'], (basex, BASEY))
-        # print score so player overlaps the score
-        showScore(score)
+def update_display():
+    AUDIO.end_frame()
+    CAPTURE.capture(pygame.display.get_surface())
+    if isinstance(SCREEN, DirtyScreen):
+        SCREEN.update()
+    else:
+        pygame.display.update()
+    startup.first_frame()
 
-        player.draw(SCREEN, True)
 
+def show_idle_screen(idle):
+    """the screen is still, only shows it again when the window asks for it"""
+    if idle.exposed:
         pygame.display.update()
-        FPSCLOCK.tick(FPS)
 
 
 def showScore(score):
     """displays score in center of screen"""
+    SCREEN.blits(SCORE_LAYOUTS.get((score, IMAGES['numbers']), score_layout, score), False)
+
+
+def score_layout(score):
+    """the (digit image, position) blits of a score, centered"""
     scoreDigits = [int(x) for x in list(str(score))]
     totalWidth = 0  # total width of all numbers to be printed
 
@@ -341,9 +735,11 @@ def showScore(score):
 
     Xoffset = (SCREENWIDTH - totalWidth) / 2
 
+    layout = []
     for digit in scoreDigits:
-        SCREEN.blit(IMAGES['numbers'][digit], (Xoffset, SCREENHEIGHT * 0.1))
+        layout.append((IMAGES['numbers'][digit], (Xoffset, SCREENHEIGHT * 0.1)))
         Xoffset += IMAGES['numbers'][digit].get_width()
+    return tuple(layout)
 
 
 def showGameOverScreen(crashInfo, player):
@@ -351,122 +747,110 @@ def showGameOverScreen(crashInfo, player):
     score = crashInfo['score']
     basex = crashInfo['basex']
 
-    upperPipes, lowerPipes = crashInfo['upperPipes'], crashInfo['lowerPipes']
+    pipes = crashInfo['pipes']
 
     # play hit and die sounds
-    SOUNDS['hit'].play()
+    AUDIO.play('hit')
     if not crashInfo['groundCrash']:
-        SOUNDS['die'].play()
+        AUDIO.play('die')
 
+    timestep = FixedStep(FPSCLOCK, FPS, RENDER_FPS, MAXSTEPS)
+    idle = IdleWait(IDLEAFTER)
     while True:
-        for event in pygame.event.get():
+        for event in idle.poll():
             if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
                 pygame.quit()
                 sys.exit()
             if event.type == KEYDOWN and (event.key == K_SPACE or event.key == K_UP):
                 if player.on_ground():
                     return
+            elif event.type == KEYDOWN and event.key == K_F9:
+                CAPTURE.save_highlight()
+
+        if AUTOPILOT and player.on_ground():
+            return
 
-        player.update()
+        if idle.idle:
+            show_idle_screen(idle)
+            continue
+        if idle.woke:
+            timestep.reset()
+        for _ in range(timestep.tick()):
+            player.update()
+            player.animate()
 
         # draw sprites
-        SCREEN.blit(IMAGES['background'], (0, 0))
+        draw_background()
 
-        upperPipes.draw(SCREEN)
-        lowerPipes.draw(SCREEN)
+        draw_pipes(pipes.upper_pipes())
+        draw_pipes(pipes.lower_pipes())
 
         SCREEN.blit(IMAGES['base'], (basex, BASEY))
         showScore(score)
 
-        player.draw(SCREEN)
+        player.blit(SCREEN, alpha=timestep.alpha)
 
-        FPSCLOCK.tick(FPS)
-        pygame.display.update()
+        update_display()
 
 
-def get_random_pipes(upper_group, lower_group, posx):
-    """returns a randomly generated upper and lower pipes"""
+def get_random_pipes(pipes, posx):
+    """adds a randomly generated upper and lower pipe to the ring"""
     # y of gap between upper and lower pipe
-    gapY = random.randrange(0, int(BASEY * 0.6 - PIPEGAPSIZE))
+    gapY = PIPE_RANDOM.randrange(0, int(BASEY * 0.6 - PIPEGAPSIZE))
     gapY += int(BASEY * 0.2)
-    pipeHeight = IMAGES['pipe'][0].get_height()
-
-    Pipe(IMAGES['pipe'][0], posx, gapY - pipeHeight).add(upper_group)  # upper pipe
-    Pipe(IMAGES['pipe'][1], posx, gapY + PIPEGAPSIZE).add(lower_group)  # lower pipe
+    pipes.add(posx, gapY)
 
 
-def check_crash(player, upper_pipes, lower_pipes):
+def check_crash(player, pipes):
+    """only the pipe pairs in the bird's columns can hit it"""
     if player.rect.y + player.rect.height >= BASEY - 1:
         return [True, True]
     else:
-        for pipe in upper_pipes:
-            if pygame.sprite.collide_mask(player, pipe):
-                return [True, False]
-        for pipe in lower_pipes:
-            if pygame.sprite.collide_mask(player, pipe):
-                return [True, False]
-    return [False, False]
-
-
-
-def check_crash_old(player, upper_pipes, lower_pipes):
-    pi = player['index']
-    player['w'] = IMAGES['player'][0].get_width()
-    player['h'] = IMAGES['player'][0].get_height()
-
-    if player['y'] + player['h'] >= BASEY - 1:
-        return [True, True]
-    else:
-        player_rect = pygame.Rect(player['x'], player['y'], player['w'], player['h'])
-        pipeW = IMAGES['pipe'][0].get_width()
-        pipeH = IMAGES['pipe'][0].get_height()
-
-        for uPipe, lPipe in zip(upper_pipes, lower_pipes):
-            # upper and lower pipe rects
-            uPipeRect = pygame.Rect(uPipe['x'], uPipe['y'], pipeW, pipeH)
-            lPipeRect = pygame.Rect(lPipe['x'], lPipe['y'], pipeW, pipeH)
-
-            # player and upper/lower pipe hitmasks
-            pHitMask = HITMASKS['player'][pi]
-            uHitmask = HITMASKS['pipe'][0]
-            lHitmask = HITMASKS['pipe'][1]
-
-            # if bird collided with upipe or lpipe
-            uCollide = pixelCollision(player_rect, uPipeRect, pHitMask, uHitmask)
-            lCollide = pixelCollision(player_rect, lPipeRect, pHitMask, lHitmask)
-
-            if uCollide or lCollide:
+        for upper, lower in pipes.near(player.rect):
+            if pygame.sprite.collide_mask(player, upper) or pygame.sprite.collide_mask(player, lower):
                 return [True, False]
-
     return [False, False]
 
 
-def pixelCollision(rect1, rect2, hitmask1, hitmask2):
-    """Checks if two objects collide and not just their rects"""
-    rect = rect1.clip(rect2)
-
-    if rect.width == 0 or rect.height == 0:
-        return False
-
-    x1, y1 = rect.x - rect1.x, rect.y - rect1.y
-    x2, y2 = rect.x - rect2.x, rect.y - rect2.y
-
-    for x in range(rect.width):
-        for y in range(rect.height):
-            if hitmask1[x1+x][y1+y] and hitmask2[x2+x][y2+y]:
-                return True
-    return False
-
-
-def getHitmask(image):
-    """returns a hitmask using an image's alpha."""
-    mask = []
-    for x in range(image.get_width()):
-        mask.append([])
-        for y in range(image.get_height()):
-            mask[x].append(bool(image.get_at((x, y))[3]))
-    return mask
+def run(argv=None):
+    """parses the command line and plays, the entry point of the launcher"""
+    parser = argparse.ArgumentParser(description='Flappy Bird')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='only redraw and update the changed regions of the screen')
+    parser.add_argument('--render-fps', type=int,
+                        help='draw at this frame rate, interpolating the {} steps/s game logic'.format(FPS))
+    parser.add_argument('--max-steps', type=int, default=MAXSTEPS,
+                        help='most game steps caught up after a slow frame')
+    parser.add_argument('--record', metavar='DIR',
+                        help='save the replay of every run into DIR, check them with verify_replays.py')
+    parser.add_argument('--idle-after', type=float, default=IDLEAFTER, metavar='SECONDS',
+                        help='stop the welcome and game over animations after SECONDS without input')
+    parser.add_argument('--no-idle', action='store_true', help='never stop the welcome and game over animations')
+    parser.add_argument('--loose-assets', action='store_true',
+                        help='decode the image files in res/images even if res/sprites.atlas exists (see atlas.py)')
+    profiler.add_arguments(parser)
+    capture.add_arguments(parser)
+    parser.add_argument('--autopilot', action='store_true',
+                        help='let the search autopilot play, rounds start by themselves (see autopilot.py)')
+    parser.add_argument('--ghosts', metavar='DIR',
+                        help='race the best runs recorded in DIR (--record DIR) as ghosts')
+    parser.add_argument('--ghost-count', type=int, default=500, metavar='N', help='most ghosts, the best scores')
+    audio.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if (args.capture or args.highlight) and not capture.AVAILABLE:
+        parser.error('recording needs numpy')
+    ghost_tracks = None
+    if args.ghosts:
+        import ghosts
+        ghost_tracks = ghosts.load(args.ghosts, args.ghost_count)
+        print('{} ghosts from {}'.format(len(ghost_tracks), args.ghosts))
+    main(dirty_rects=args.dirty_rects, render_fps=args.render_fps, max_steps=args.max_steps,
+         replay_dir=args.record, frame_profiler=profiler.from_arguments(args),
+         idle_after=None if args.no_idle else args.idle_after,
+         frame_capture=capture.from_arguments(args, args.render_fps or FPS), loose_assets=args.loose_assets,
+         sound_board=audio.from_arguments(args, SOUND_CHANNELS), autopilot=args.autopilot,
+         ghost_tracks=ghost_tracks)
 
 
 if __name__ == "__main__":
-    main()
+    run()
@@ -0,0 +1,138 @@
+"""
+Asset registry
+
+Every asset is registered under a key with the function that builds it. The
+first get() of a key builds it (a miss), later ones hand out the same object
+(a hit), so images are decoded and converted once for the whole session
+instead of once per round.
+
+load_async() builds assets on the thread of a gamekit.loader.AssetLoader
+instead. ready() tells if they are there; get() of one still loading waits
+for it, or builds it right away if the loader hasn't started it.
+
+SDL locks a surface while it reads its pixels, and a blit of a locked
+surface on another thread fails. Only assets built from files (decoding
+images and sounds) are safe on the loader. Assets reading the pixels of
+surfaces the game may be drawing (rotations, masks, subsurfaces of a shared
+sheet) are registered with background=False: load_async() skips them and
+get() builds them on the thread asking, the one drawing.
+"""
+
+import pygame
+
+
+def load_image(path, alpha=True):
+    """loads an image and converts it to the display format"""
+    image = pygame.image.load(path)
+    return image.convert_alpha() if alpha else image.convert()
+
+
+class AssetRegistry:
+    def __init__(self):
+        self._builders = {}
+        self._assets = {}
+        self._pending = {}  # key -> Future of the assets given to the loader
+        self._foreground = set()  # keys never given to the loader
+        self._loader = None
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, key, builder, *args, background=True):
+        """
+        builder(*args) is called the first time the key is asked for
+        :param background: False if the builder reads pixels the game may be drawing
+        """
+        self._builders[key] = (builder, args)
+        self._assets.pop(key, None)
+        self._pending.pop(key, None)
+        if background:
+            self._foreground.discard(key)
+        else:
+            self._foreground.add(key)
+
+    def get(self, key):
+        try:
+            asset = self._assets[key]
+        except KeyError:
+            self.misses += 1
+            future = self._pending.get(key)
+            if future is not None:
+                return self._loader.result(future)
+            return self._build(key)
+        self.hits += 1
+        return asset
+
+    def _build(self, key):
+        builder, args = self._builders[key]
+        asset = self._assets[key] = builder(*args)
+        return asset
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key in self._builders
+
+    def preload(self, keys=None):
+        """builds all the assets, or the given keys, up front"""
+        for key in list(self._builders if keys is None else keys):
+            if key not in self._assets:
+                self.get(key)
+
+    def load_async(self, loader, keys=None, priority=0):
+        """
+        builds all the assets, or the given keys, on the loader's thread
+        the ones registered with background=False are left to get()
+        :param priority: lower loads first, keys already queued move up to it
+        """
+        self._loader = loader
+        for key in list(self._builders if keys is None else keys):
+            if key in self._assets or key in self._foreground:
+                continue
+            future = self._pending.get(key)
+            if future is None:
+                self._pending[key] = loader.submit(self._build, key, priority=priority)
+            else:
+                loader.prioritize(future, priority)
+
+    def _background_keys(self):
+        return [key for key in self._builders if key not in self._foreground]
+
+    def ready(self, keys=None):
+        """True when get() of all the assets, or the given keys, doesn't wait for the loader"""
+        return all(key in self._assets or key in self._foreground
+                   for key in (self._builders if keys is None else keys))
+
+    def progress(self):
+        """the fraction of the background assets built"""
+        keys = self._background_keys()
+        return sum(key in self._assets for key in keys) / len(keys) if keys else 1.0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'assets': len(self._assets),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class PendingSound:
+    """a sound of the registry that plays once it is loaded, and before that doesn't"""
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def get(self):
+        """the sound, None while it is loading"""
+        if self.registry.ready((self.key,)):
+            return self.registry[self.key]
+        return None
+
+    def play(self, *args, **kwargs):
+        sound = self.get()
+        if sound is not None:
+            return sound.play(*args, **kwargs)
+        return None
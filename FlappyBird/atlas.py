@@ -0,0 +1,181 @@
+"""
+Sprite atlas
+
+Packs every sprite of the game into one file of raw pixels, so starting the
+game maps one file instead of decoding ~25 PNGs:
+    python atlas.py            builds res/sprites.atlas from res/images
+The game uses the atlas when the file is there and the PNG files otherwise
+(or with --loose-assets), so build it again after changing an image.
+
+    b'FBA' version:u8 index_length:u32 index(JSON) padding pixels hitmasks
+
+The pixels are one width x height image in BGRA byte order, which is the
+layout convert_alpha() gives on a usual 32 bit display, so a sprite is a
+subsurface of the mapped pixels and nothing is decoded or copied. The index
+maps the path of every image to its rect, an upper pipe is its path + '@180'
+(rotated at build time). The hit masks of the birds and pipes follow the
+pixels, each row as little-endian bytes. They are solid where alpha is above
+127, as pygame.mask.from_surface, so the game takes its collision masks from
+the file instead of reading the pixels of the sheet it draws from.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+from collision import Hitmask
+
+MAGIC = b'FBA'
+VERSION = 2  # 1 kept the hit masks at threshold 0
+ATLASPATH = 'res/sprites.atlas'
+ATLASWIDTH = 1024
+ROTATED = '{}@180'  # name of an image rotated by 180
+
+_HEADER = struct.Struct('<3sBI')
+_ALIGN = 16
+
+
+def pack(sizes, width=ATLASWIDTH):
+    """
+    shelf packing, the tallest first
+    :param sizes: {name: (w, h)}
+    :return: ({name: (x, y)}, atlas height)
+    """
+    positions = {}
+    x = y = shelf_height = 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], name)):
+        w, h = sizes[name]
+        if x + w > width:
+            x, y = 0, y + shelf_height
+            shelf_height = 0
+        positions[name] = (x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return positions, y + shelf_height
+
+
+def build(path, images, hitmask_names, width=ATLASWIDTH):
+    """
+    :param images: {name: (surface, alpha)}, opaque images get alpha 255
+    :param hitmask_names: names of the images to keep a hit mask of
+    """
+    sizes = {name: surface.get_size() for name, (surface, _) in images.items()}
+    width = max([width] + [w for w, _ in sizes.values()])
+    positions, height = pack(sizes, width)
+    sheet = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    sprites = {}
+    for name, (surface, alpha) in images.items():
+        x, y = positions[name]
+        if not alpha:
+            surface = surface.copy()
+            surface.fill((0, 0, 0, 255), special_flags=pygame.BLEND_RGBA_MAX)
+        sheet.blit(surface, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        sprites[name] = [x, y, sizes[name][0], sizes[name][1], alpha]
+
+    masks = bytearray()
+    hitmasks = {}
+    for name in hitmask_names:
+        hitmask = Hitmask.from_surface(images[name][0])
+        row_bytes = (hitmask.width + 7) // 8
+        hitmasks[name] = [len(masks), hitmask.width, hitmask.height]
+        for row in hitmask.rows:
+            masks += row.to_bytes(row_bytes, 'little')
+
+    index = {'size': [width, height], 'format': 'BGRA', 'sprites': sprites, 'hitmasks': hitmasks}
+    data = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    start = _HEADER.size + len(data)
+    padding = -start % _ALIGN
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(data)))
+        f.write(data)
+        f.write(bytes(padding))
+        f.write(pygame.image.tobytes(sheet, 'BGRA'))
+        f.write(masks)
+
+
+class Atlas:
+    """the sprites of an atlas file, mapped into memory"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a version {} atlas'.format(path, VERSION))
+        index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length])
+        start = _HEADER.size + index_length
+        start += -start % _ALIGN
+        width, height = index['size']
+        end = start + width * height * 4
+        self._sprites = index['sprites']
+        self._hitmasks = index['hitmasks']
+        self._masks = memoryview(self._map)[end:]
+        # the surface uses the mapped pages, the OS reads them in when they are first drawn
+        self.surface = pygame.image.frombuffer(memoryview(self._map)[start:end], (width, height), index['format'])
+
+    def __contains__(self, name):
+        return name in self._sprites
+
+    def image(self, name):
+        """the sprite as a subsurface, converted only if the display has another pixel format"""
+        x, y, w, h, alpha = self._sprites[name]
+        image = self.surface.subsurface((x, y, w, h))
+        display = pygame.display.get_surface()
+        if display is None:
+            return image
+        if not alpha:
+            return image.convert()  # opaque sprites blit faster without alpha
+        if display.get_masks()[:3] != image.get_masks()[:3]:
+            return image.convert_alpha()
+        return image
+
+    def hitmask(self, name):
+        offset, width, height = self._hitmasks[name]
+        row_bytes = (width + 7) // 8
+        rows = [int.from_bytes(self._masks[offset + y * row_bytes:offset + (y + 1) * row_bytes], 'little')
+                for y in range(height)]
+        return Hitmask(rows, width)
+
+
+def load(path):
+    """the atlas at path, None if there is none or it can't be used"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return Atlas(path)
+    except (ValueError, struct.error) as e:
+        print('{}, loading the image files instead'.format(e), file=sys.stderr)
+        return None
+
+
+def main():
+    from FlappyBird import NUMBERS_LIST, SPRITES, PLAYERS_LIST, BACKGROUNDS_LIST, PIPES_LIST, GAMEDIR, res_path
+    images = {}
+    for path in NUMBERS_LIST + tuple(SPRITES.values()):
+        images[path] = (pygame.image.load(res_path(path)), True)
+    for path in BACKGROUNDS_LIST:
+        images[path] = (pygame.image.load(res_path(path)), False)
+    hitmask_names = []
+    for paths in PLAYERS_LIST:
+        for path in paths:
+            images[path] = (pygame.image.load(res_path(path)), True)
+            hitmask_names.append(path)
+    for path in PIPES_LIST:
+        image = pygame.image.load(res_path(path))
+        images[path] = (image, True)
+        images[ROTATED.format(path)] = (pygame.transform.rotate(image, 180), True)
+        hitmask_names += [ROTATED.format(path), path]
+
+    path = os.path.join(GAMEDIR, ATLASPATH)
+    build(path, images, hitmask_names)
+    print('{} sprites, {} hit masks, {} bytes in {}'.format(
+        len(images), len(hitmask_names), os.path.getsize(path), path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
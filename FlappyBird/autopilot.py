@@ -0,0 +1,279 @@
+"""
+Search autopilot for Flappy Bird
+
+Decides flap or no flap before every step by searching the steps ahead with
+the physics of Bird.update and the pipe pairs already in the game. A new pair
+appears at x = SCREENWIDTH + 10 and needs more than HORIZON steps to reach
+the bird, so up to HORIZON steps ahead every pipe is known and the search is
+exact, not a guess.
+
+Two flap choices per step make 2^HORIZON paths, but the bird's state is only
+(y, velocity) at a given step, and there are only a few hundred of those. The
+depth-first search keeps what it learned about every state in a StateCache,
+(step, y, velocity) -> steps survived from there, so a state reached by many
+paths is searched once, and the next decision (one step later, one step
+deeper) reuses everything but the new last step. Steps already played are
+dropped from the cache.
+
+    python autopilot.py --games 20      plays headless, prints the scores, how
+                                        far it sees and how long it decides
+    python evaluate.py --agents autopilot:agent
+    python FlappyBird.py --autopilot    lets it play the game (attract mode)
+"""
+
+import argparse
+import sys
+import time
+import weakref
+from collections import deque
+
+from batch_sim import (BIRDWIDTH, BIRDHEIGHT, PIPEWIDTH, PIPEHEIGHT, MAX_VEL_Y, ACCELERATION_Y,
+                       FLAP_ACCELERATION, PIPE_VELOCITY, PLAYERX, FLAP_CYCLE, BatchFlappy, load_collider,
+                       load_hitmasks)
+from FlappyBird import SCREENWIDTH, PIPEGAPSIZE, BASEY
+from gamekit.stats import percentiles
+
+# steps until a pipe pair added now can reach the bird's columns
+HORIZON = (SCREENWIDTH + 10 - PLAYERX - BIRDWIDTH) // -PIPE_VELOCITY - 1
+WINDOW = 1000  # decisions kept for the percentiles
+MAXFRAMES = 5000  # headless games still alive after this many steps are stopped
+
+
+def bird_frame(anim_steps):
+    """image index of a bird after anim_steps Bird.animate calls"""
+    turns = anim_steps // 5
+    return int(FLAP_CYCLE[(turns - 1) % len(FLAP_CYCLE)]) if turns else 0
+
+
+class StateCache:
+    """
+    (step, y, velocity) -> (survived, exact), one dict per step
+    survived counts the crash checks passed from the state on; exact means
+    every path from there was followed to its crash, otherwise the search
+    stopped at its depth and the bird survives at least that long
+    """
+
+    def __init__(self):
+        self._steps = {}
+        self.hits = 0
+        self.misses = 0
+        self.peak = 0
+
+    def level(self, step):
+        """the dict of (y, velocity) -> (survived, exact) of a step"""
+        level = self._steps.get(step)
+        if level is None:
+            level = self._steps[step] = {}
+        return level
+
+    def prune(self, step):
+        """forgets the steps before step, they can't be reached again"""
+        for old in [s for s in self._steps if s < step]:
+            del self._steps[old]
+
+    def clear(self):
+        self._steps.clear()
+
+    def __len__(self):
+        return sum(len(level) for level in self._steps.values())
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'peak': self.peak,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class Autopilot:
+    """plays one game, decide() once before every step"""
+
+    def __init__(self, bird_hitmasks, upper_hitmask, lower_hitmask, horizon=HORIZON, window=WINDOW):
+        """
+        :param horizon: steps searched ahead, at most HORIZON
+        :param window: decisions kept for stats(), None keeps all
+        """
+        self.birds = tuple(bird_hitmasks)
+        self.upper = upper_hitmask
+        self.lower = lower_hitmask
+        self.horizon = min(horizon, HORIZON)
+        self.cache = StateCache()
+        self.decisions = 0
+        self.flaps = 0
+        self.nodes = 0  # states searched, cache hits not counted
+        self.times = deque(maxlen=window)  # seconds per decision
+        self.depths = deque(maxlen=window)  # steps the chosen move is known to survive
+        self._pipes = ()  # (x at step 0, gap y)
+        self._anim_offset = 0  # Bird.animate calls before step 0
+        self._last_step = None
+
+    def decide(self, step, y, velocity, pipes, anim_steps):
+        """
+        :param step: steps of main_game played so far
+        :param y: top of the bird, velocity its Bird.velocity_y
+        :param pipes: (x, gap y) of the pipe pairs now
+        :param anim_steps: Bird.animate calls so far
+        :return: True to flap in this step
+        """
+        begin_time = time.perf_counter()
+        if self._last_step is not None and step <= self._last_step:
+            self.cache.clear()  # a new game
+        self._last_step = step
+        self.cache.prune(step + 1)
+        self._pipes = tuple((x - PIPE_VELOCITY * step, gap_y) for x, gap_y in pipes)
+        self._anim_offset = anim_steps - step
+
+        # the crash check of this step comes after the flap and doesn't depend on it
+        fall = self._survive(step + 1, *self._move(y, velocity, False), self.horizon)
+        flap = fall < self.horizon and y > -2 * BIRDHEIGHT
+        if flap:
+            rise = self._survive(step + 1, *self._move(y, velocity, True), self.horizon)
+            flap = rise > fall
+        self.cache.peak = max(self.cache.peak, len(self.cache))
+
+        self.decisions += 1
+        self.flaps += flap
+        self.depths.append(rise if flap else fall)
+        self.times.append(time.perf_counter() - begin_time)
+        return flap
+
+    def _move(self, y, velocity, flap):
+        """Bird.flap_once and Bird.update, the state one step later"""
+        if flap and y > -2 * BIRDHEIGHT:
+            velocity = FLAP_ACCELERATION
+        if velocity < MAX_VEL_Y:
+            velocity += ACCELERATION_Y
+        return y + velocity, velocity
+
+    def _survive(self, step, y, velocity, need):
+        """crash checks passed from the state before step on, the search stops at need"""
+        level = self.cache.level(step)
+        key = (y, velocity)
+        entry = level.get(key)
+        if entry is not None and (entry[1] or entry[0] >= need):
+            self.cache.hits += 1
+            return entry[0]
+        self.cache.misses += 1
+        self.nodes += 1
+
+        if self._crashes(step, y):
+            level[key] = (0, True)
+            return 0
+        survived = 1
+        if need > 1:
+            # 先试不拍, a flap costs height that is hard to get rid of
+            best = self._survive(step + 1, *self._move(y, velocity, False), need - 1)
+            if best < need - 1 and y > -2 * BIRDHEIGHT:
+                best = max(best, self._survive(step + 1, *self._move(y, velocity, True), need - 1))
+            survived += best
+        # stopped at need unless every path crashed earlier
+        level[key] = (survived, survived < need)
+        return survived
+
+    def _crashes(self, step, y):
+        """check_crash for the bird at y before step runs"""
+        if y + BIRDHEIGHT >= BASEY - 1:
+            return True
+        bird = None
+        for x, gap_y in self._pipes:
+            x += PIPE_VELOCITY * step
+            if x >= PLAYERX + BIRDWIDTH or x + PIPEWIDTH <= PLAYERX:
+                continue
+            if gap_y <= y and y + BIRDHEIGHT <= gap_y + PIPEGAPSIZE:
+                continue  # inside the gap
+            if bird is None:
+                bird = self.birds[bird_frame(self._anim_offset + step)]
+            if (bird.overlap(self.upper, (x - PLAYERX, gap_y - PIPEHEIGHT - y)) or
+                    bird.overlap(self.lower, (x - PLAYERX, gap_y + PIPEGAPSIZE - y))):
+                return True
+        return False
+
+    def stats(self):
+        """decision time in milliseconds and search depth over the last decisions"""
+        stats = {
+            'decisions': self.decisions,
+            'flaps': self.flaps,
+            'horizon': self.horizon,
+            'nodes_per_decision': self.nodes / self.decisions if self.decisions else 0.0,
+        }
+        if self.times:
+            stats.update(percentiles(self.times, scale=1000))
+            stats.update({
+                'min_depth': min(self.depths),
+                'mean_depth': sum(self.depths) / len(self.depths),
+            })
+        stats.update(self.cache.stats())
+        return stats
+
+
+_pilots = weakref.WeakKeyDictionary()  # BatchFlappy -> one Autopilot per game, gone with the sim
+
+
+def agent(sim):
+    """
+    evaluate.py agent, one Autopilot per game of the BatchFlappy
+    the games must start with anim_steps=0 (BatchFlappy.reset's default)
+    """
+    pilots = _pilots.get(sim)
+    if pilots is None:
+        hitmasks = load_hitmasks()
+        pilots = _pilots[sim] = [Autopilot(*hitmasks) for _ in range(sim.n)]
+    flap = [False] * sim.n
+    for row in range(sim.n):
+        if sim.crashed[row]:
+            continue
+        count = sim.pipe_count[row]
+        pipes = zip(sim.pipe_x[row, :count].tolist(), sim.pipe_gap[row, :count].tolist())
+        flap[row] = pilots[row].decide(int(sim.frames[row]), int(sim.y[row]), int(sim.velocity_y[row]),
+                                       pipes, int(sim.frames[row]))
+    return flap
+
+
+def main():
+    parser = argparse.ArgumentParser(description='plays Flappy Bird headless with the search autopilot')
+    parser.add_argument('--games', type=int, default=10, help='games, one per seed')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--max-frames', type=int, default=MAXFRAMES, help='stop games still alive after this')
+    parser.add_argument('--horizon', type=int, default=HORIZON,
+                        help='steps searched ahead, at most {}'.format(HORIZON))
+    args = parser.parse_args()
+
+    hitmasks = load_hitmasks()
+    sim = BatchFlappy(args.games, collider=load_collider(), seeds=range(args.first_seed, args.first_seed + args.games))
+    pilots = [Autopilot(*hitmasks, horizon=args.horizon) for _ in range(sim.n)]
+    _pilots[sim] = pilots
+    begin_time = time.perf_counter()
+    for _ in range(args.max_frames):
+        sim.step(agent(sim))
+        if sim.crashed.all():
+            break
+    elapsed = time.perf_counter() - begin_time
+
+    print('{} games: mean score {:.1f}, max score {}, {} crashed, {} alive after {} steps'.format(
+        sim.n, sim.score.mean(), sim.score.max(), sim.crashed.sum(), (~sim.crashed).sum(), args.max_frames))
+    total = Autopilot((), None, None, args.horizon, window=None)
+    for pilot in pilots:
+        total.decisions += pilot.decisions
+        total.flaps += pilot.flaps
+        total.nodes += pilot.nodes
+        total.times.extend(pilot.times)
+        total.depths.extend(pilot.depths)
+        total.cache.hits += pilot.cache.hits
+        total.cache.misses += pilot.cache.misses
+        total.cache.peak = max(total.cache.peak, pilot.cache.peak)
+    s = total.stats()
+    print('decide ms  p50 {p50:.3f}  p95 {p95:.3f}  p99 {p99:.3f}  max {max:.3f}   ({decisions} decisions, '
+          '{flaps} flaps)'.format(**s))
+    print('depth      horizon {horizon} steps, chosen move survives {mean_depth:.1f} on average, '
+          '{min_depth} at least'.format(**s))
+    print('cache      hit rate {hit_rate:.1%} ({hits} hits, {misses} misses), {nodes_per_decision:.1f} states '
+          'searched per decision, {peak} entries at most'.format(**s))
+    print('{:.2f}s, {:,.0f} decisions/s'.format(elapsed, total.decisions / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Headless batch simulator for Flappy Bird
+
+Steps many independent games at once, with no display, no event queue and no
+clock. Every field of the game state is one NumPy array (struct-of-arrays) and
+one call to BatchFlappy.step() runs one frame of main_game() for all games:
+    1, flap --- Bird.flap_once for the games whose action is set
+    2, crash --- check_crash, against the ground and the pipe pixels
+    3, score --- the pipe middle passes the bird middle
+    4, pipes --- add a new pipe pair / remove the one that left the screen
+    5, move --- Bird.update, Pipe.update and the flap animation of Bird.draw
+"""
+
+import os
+import random
+import time
+
+import numpy as np
+import pygame
+
+from FlappyBird import SCREENWIDTH, SCREENHEIGHT, PIPEGAPSIZE, BASEY, PLAYERS_LIST, PIPES_LIST
+from collision import BirdPipeCollider, Hitmask
+
+# sprite sizes, same as the images in res/images
+BIRDWIDTH = 34
+BIRDHEIGHT = 24
+PIPEWIDTH = 52
+PIPEHEIGHT = 320
+
+# same values as Bird.__init__ and Pipe.__init__
+VELOCITY_Y = -9  # 初始速度
+MAX_VEL_Y = 10  # 最大速度
+ACCELERATION_Y = 1  # 向下加速度
+ROTATION = 45  # 初始角度
+VEL_ROTATE = 3  # 转动速度
+MIN_ROTATION = -90
+FLAP_ACCELERATION = -9  # 拍动后的速度
+PIPE_VELOCITY = -4
+
+# 小鸟的初始位置, same as main()
+PLAYERX = int(SCREENWIDTH * 0.2)
+PLAYERY = int((SCREENHEIGHT - BIRDHEIGHT) / 2)
+PLAYERMIDX = PLAYERX + BIRDWIDTH / 2
+
+# the bird stands on the ground once its bottom reaches BASEY - 1,
+# Rect rounds the fractional last move of Bird.update to this top
+GROUNDY = round(BASEY - BIRDHEIGHT)
+
+# random gap range of get_random_pipes
+GAPY_MIN = int(BASEY * 0.2)
+GAPY_RANGE = int(BASEY * 0.6 - PIPEGAPSIZE)
+
+# at most 3 pipe pairs are on the screen at the same time
+MAX_PIPES = 4
+
+# image index sequence of Bird._img_index_gen
+FLAP_CYCLE = np.array([0, 1, 2, 1], dtype=np.int8)
+
+
+def load_hitmasks(player_index=0, pipe_index=0):
+    """the bird frames, upper and lower pipe masks check_crash uses (pygame.mask threshold)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    birds = [Hitmask.from_surface(pygame.image.load(os.path.join(here, path)))
+             for path in PLAYERS_LIST[player_index]]
+    pipe = pygame.image.load(os.path.join(here, PIPES_LIST[pipe_index]))
+    return birds, Hitmask.from_surface(pygame.transform.rotate(pipe, 180)), Hitmask.from_surface(pipe)
+
+
+def load_collider(player_index=0, pipe_index=0):
+    """collider with the masks check_crash uses for a bird and pipe image"""
+    return BirdPipeCollider(*load_hitmasks(player_index, pipe_index), PIPEGAPSIZE)
+
+
+class BatchFlappy:
+    def __init__(self, n, seed=None, collider=None, seeds=None):
+        """
+        :param seed: seed of the pipe gaps of all games
+        :param seeds: one seed per game instead, the gaps then come in the same
+                      order as get_random_pipes with PIPE_RANDOM seeded by it
+        """
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.collider = collider or load_collider()
+        self.seeds = None if seeds is None else list(seeds)
+        self._pipe_randoms = None if seeds is None else [random.Random() for _ in range(n)]
+
+        # bird state
+        self.y = np.zeros(n, dtype=np.int32)
+        self.velocity_y = np.zeros(n, dtype=np.int32)
+        self.rotation = np.zeros(n, dtype=np.int32)
+        self.flap_index = np.zeros(n, dtype=np.int8)  # 当前小鸟图案
+        self._anim_next = np.zeros(n, dtype=np.int8)  # position in FLAP_CYCLE
+        self._loop_iter = np.zeros(n, dtype=np.int8)
+
+        # pipe state, the oldest pipe pair is in column 0
+        self.pipe_x = np.zeros((n, MAX_PIPES), dtype=np.int32)
+        self.pipe_gap = np.zeros((n, MAX_PIPES), dtype=np.int32)  # y of the gap top
+        self.pipe_count = np.zeros(n, dtype=np.int32)
+
+        # game state
+        self.score = np.zeros(n, dtype=np.int32)
+        self.frames = np.zeros(n, dtype=np.int32)
+        self.crashed = np.zeros(n, dtype=bool)
+        self.ground_crash = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+    def reset(self, which=None, start_y=PLAYERY, anim_steps=0):
+        """
+        restarts the games selected by the bool array which, or all games
+        :param start_y: top of the bird when main_game starts, scalar or one per game
+        :param anim_steps: Bird.animate calls before main_game (the welcome
+                           screen), scalar or one per game
+        """
+        if which is None:
+            rows = np.arange(self.n)
+        else:
+            rows = np.flatnonzero(which)
+        if not len(rows):
+            return
+
+        if self._pipe_randoms is not None:
+            for row in rows:
+                self._pipe_randoms[row].seed(self.seeds[row])
+
+        self.y[rows] = start_y
+        self.velocity_y[rows] = VELOCITY_Y
+        self.rotation[rows] = ROTATION
+        # the image changes every 5th call and the loop counter wraps at 30
+        turns = np.asarray(anim_steps) // 5
+        self.flap_index[rows] = np.where(turns > 0, FLAP_CYCLE[(turns - 1) % len(FLAP_CYCLE)], 0)
+        self._anim_next[rows] = turns % len(FLAP_CYCLE)
+        self._loop_iter[rows] = np.asarray(anim_steps) % 30
+
+        # 2 pipe pairs to start with, same as main_game
+        self.pipe_count[rows] = 0
+        self._add_pipes(rows, SCREENWIDTH + 200)
+        self._add_pipes(rows, SCREENWIDTH + 200 + SCREENWIDTH // 2)
+
+        self.score[rows] = 0
+        self.frames[rows] = 0
+        self.crashed[rows] = False
+        self.ground_crash[rows] = False
+
+    def random_gaps(self, rows):
+        """returns the gap y of a new pipe pair for each game in rows"""
+        if self._pipe_randoms is not None:
+            return np.array([GAPY_MIN + self._pipe_randoms[row].randrange(0, GAPY_RANGE) for row in rows],
+                            dtype=np.int32)
+        return GAPY_MIN + self.rng.integers(0, GAPY_RANGE, size=len(rows))
+
+    def _add_pipes(self, rows, posx):
+        cols = self.pipe_count[rows]
+        self.pipe_x[rows, cols] = posx
+        self.pipe_gap[rows, cols] = self.random_gaps(rows)
+        self.pipe_count[rows] += 1
+
+    def _remove_first_pipes(self, rows):
+        self.pipe_x[rows, :-1] = self.pipe_x[rows, 1:]
+        self.pipe_gap[rows, :-1] = self.pipe_gap[rows, 1:]
+        self.pipe_count[rows] -= 1
+
+    def pipe_valid(self):
+        """bool array (n, MAX_PIPES) of the columns holding a pipe pair"""
+        return np.arange(MAX_PIPES) < self.pipe_count[:, None]
+
+    def next_pipe(self):
+        """x and gap y of the first pipe pair the bird has not passed yet"""
+        ahead = self.pipe_valid() & (self.pipe_x + PIPEWIDTH > PLAYERX)
+        col = ahead.argmax(axis=1)
+        rows = np.arange(self.n)
+        return self.pipe_x[rows, col], self.pipe_gap[rows, col]
+
+    def pipe_hit(self, alive):
+        """bool array of the alive games whose bird overlaps a pipe"""
+        # only the pipes in the bird's column are handed to the collider
+        near = (alive[:, None] & self.pipe_valid() &
+                (self.pipe_x < PLAYERX + BIRDWIDTH) & (self.pipe_x + PIPEWIDTH > PLAYERX))
+        rows, cols = np.nonzero(near)
+        hit = np.zeros(self.n, dtype=bool)
+        if len(rows):
+            pipe_hit = self.collider.hit(self.flap_index[rows], PLAYERX, self.y[rows],
+                                         self.pipe_x[rows, cols], self.pipe_gap[rows, cols])
+            hit[rows[pipe_hit]] = True
+        return hit
+
+    def step(self, flap):
+        """
+        runs one frame of every game
+        :param flap: bool array, True for the games that flap in this frame
+        :return: crash, score: bool array of the games that crashed in this
+                 frame, and the running score of every game
+        """
+        alive = ~self.crashed
+
+        # flap_once, only if the bird is not too far above the screen
+        flapped = alive & np.asarray(flap, dtype=bool) & (self.y > -2 * BIRDHEIGHT)
+        self.velocity_y[flapped] = FLAP_ACCELERATION
+        self.rotation[flapped] = ROTATION
+
+        # check_crash
+        on_ground = self.y + BIRDHEIGHT >= BASEY - 1
+        crash = alive & (on_ground | self.pipe_hit(alive))
+        self.crashed |= crash
+        self.ground_crash |= crash & on_ground
+        alive &= ~crash
+        flying = alive & ~on_ground
+
+        # check for scores, 在pipe中点及之后4个距离内加1分
+        pipe_mid = self.pipe_x + PIPEWIDTH / 2
+        passed = self.pipe_valid() & (pipe_mid <= PLAYERMIDX) & (PLAYERMIDX < pipe_mid + 4)
+        self.score += (passed.any(axis=1) & alive)
+
+        # add new pipe when first pipe is about to touch left of screen
+        first = self.pipe_x[:, 0]
+        self._add_pipes(np.flatnonzero(alive & (0 < first) & (first < 5)), SCREENWIDTH + 10)
+        # remove first pipe if its out of the screen
+        self._remove_first_pipes(np.flatnonzero(alive & (first < -PIPEWIDTH)))
+
+        # Bird.update
+        self.rotation[flying & (self.rotation > MIN_ROTATION)] -= VEL_ROTATE
+        self.velocity_y[alive & (self.velocity_y < MAX_VEL_Y)] += ACCELERATION_Y
+        self.y[flying] = np.minimum(self.y[flying] + self.velocity_y[flying], GROUNDY)
+        # Pipe.update
+        self.pipe_x[alive] += PIPE_VELOCITY
+
+        # flap animation of Bird.draw, next image every 5 frames
+        turn = alive & ((self._loop_iter + 1) % 5 == 0)
+        self.flap_index[turn] = FLAP_CYCLE[self._anim_next[turn]]
+        self._anim_next[turn] = (self._anim_next[turn] + 1) % len(FLAP_CYCLE)
+        self._loop_iter[alive] = (self._loop_iter[alive] + 1) % 30
+
+        self.frames[alive] += 1
+        return crash, self.score
+
+
+def replay_flaps(replays, frames):
+    """
+    the flap array of every step of replays played together, step 0 first
+    :param replays: replay.Replay, one per game
+    """
+    # every flap as (step, replay), sorted by step
+    steps = np.array([step for r in replays for step in r.flaps], dtype=np.int64)
+    rows = np.repeat(np.arange(len(replays)), [len(r.flaps) for r in replays])
+    order = np.argsort(steps, kind='stable')
+    steps, rows = steps[order], rows[order]
+    bounds = np.searchsorted(steps, np.arange(frames + 1))
+
+    flap = np.zeros(len(replays), dtype=bool)
+    for t in range(frames):
+        flap[:] = False
+        flap[rows[bounds[t]:bounds[t + 1]]] = True
+        yield flap
+
+
+def benchmark(n=4096, frames=2000, seed=0):
+    """steps n games with random flaps and returns the steps per second"""
+    sim = BatchFlappy(n, seed)
+    rng = np.random.default_rng(seed)
+    begin_time = time.perf_counter()
+    for _ in range(frames):
+        crash, score = sim.step(rng.random(n) < 0.08)
+        sim.reset(sim.crashed)
+    return n * frames / (time.perf_counter() - begin_time)
+
+
+if __name__ == "__main__":
+    print('{:,.0f} steps/s'.format(benchmark()))
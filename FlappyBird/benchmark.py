@@ -0,0 +1,296 @@
+"""
+Micro benchmarks of the Flappy Bird hot paths
+
+Runs headless with SDL's dummy video and audio drivers. Every benchmark is
+timed until it has run for --min-time seconds, the best of --repeat rounds is
+kept, and the Python memory it allocates is measured with tracemalloc
+(Surfaces and masks are allocated by SDL and don't show up there):
+    python benchmark.py --save bench.json
+    python benchmark.py --baseline bench.json --threshold 0.1
+The second run exits with 1 if any benchmark got slower than the baseline by
+more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import FlappyBird as game
+from collision import Hitmask
+from FlappyBird import IMAGES, ASSETS, BASEY
+
+BENCHMARKS = {}
+HITMASKS = {}  # hit masks of the old collision path, the game itself uses pygame masks
+
+
+def benchmark(name):
+    """registers a function that sets up a benchmark and returns the operation to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def setup_game():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    pygame.init()
+    game.SCREEN = pygame.display.set_mode((game.SCREENWIDTH, game.SCREENHEIGHT))
+    game.register_assets()
+    ASSETS.preload()
+    for key in ('numbers', 'gameover', 'message', 'base'):
+        IMAGES[key] = ASSETS[key]
+    IMAGES['background'] = ASSETS['background', 0]
+    IMAGES['player'] = ASSETS['player', 0]
+    IMAGES['pipe'] = ASSETS['pipe', 0]
+    HITMASKS['player'] = tuple(getHitmask(image) for image in IMAGES['player'])
+    HITMASKS['pipe'] = tuple(getHitmask(image) for image in IMAGES['pipe'])
+
+
+def check_crash_old(player, upper_pipes, lower_pipes):
+    """the crash check before check_crash, every pipe pair tested with HITMASKS"""
+    pi = player['index']
+    player['w'] = IMAGES['player'][0].get_width()
+    player['h'] = IMAGES['player'][0].get_height()
+
+    if player['y'] + player['h'] >= BASEY - 1:
+        return [True, True]
+    else:
+        player_rect = pygame.Rect(player['x'], player['y'], player['w'], player['h'])
+        pipeW = IMAGES['pipe'][0].get_width()
+        pipeH = IMAGES['pipe'][0].get_height()
+
+        for uPipe, lPipe in zip(upper_pipes, lower_pipes):
+            # upper and lower pipe rects
+            uPipeRect = pygame.Rect(uPipe['x'], uPipe['y'], pipeW, pipeH)
+            lPipeRect = pygame.Rect(lPipe['x'], lPipe['y'], pipeW, pipeH)
+
+            # player and upper/lower pipe hitmasks
+            pHitMask = HITMASKS['player'][pi]
+            uHitmask = HITMASKS['pipe'][0]
+            lHitmask = HITMASKS['pipe'][1]
+
+            # if bird collided with upipe or lpipe
+            uCollide = pixelCollision(player_rect, uPipeRect, pHitMask, uHitmask)
+            lCollide = pixelCollision(player_rect, lPipeRect, pHitMask, lHitmask)
+
+            if uCollide or lCollide:
+                return [True, False]
+
+    return [False, False]
+
+
+def pixelCollision(rect1, rect2, hitmask1, hitmask2):
+    """Checks if two objects collide and not just their rects"""
+    rect = rect1.clip(rect2)
+
+    if rect.width == 0 or rect.height == 0:
+        return False
+
+    return hitmask1.overlap(hitmask2, (rect2.x - rect1.x, rect2.y - rect1.y))
+
+
+def getHitmask(image):
+    """returns a hitmask using an image's alpha."""
+    return Hitmask.from_surface(image, 0)
+
+
+def new_bird():
+    return game.Bird(IMAGES['player'], int(game.SCREENWIDTH * 0.2), 200, ASSETS['player_frames', 0])
+
+
+def new_pipes(*pairs):
+    pipes = game.PipeRing()
+    pipes.reset(IMAGES['pipe'], ASSETS['pipe_masks', 0])
+    for x, gap_y in pairs:
+        pipes.add(x, gap_y)
+    return pipes
+
+
+@benchmark('getHitmask')
+def bench_get_hitmask():
+    image = IMAGES['pipe'][1]
+    return lambda: getHitmask(image)
+
+
+@benchmark('pixelCollision')
+def bench_pixel_collision():
+    bird_hitmask, pipe_hitmask = HITMASKS['player'][0], HITMASKS['pipe'][1]
+    bird = pygame.Rect(60, 200, bird_hitmask.width, bird_hitmask.height)
+    pipe = pygame.Rect(bird.left - 10, bird.bottom, pipe_hitmask.width, pipe_hitmask.height)
+    # raise the lower pipe into the bird's rect as far as it goes without a hit,
+    # the worst case where every overlapping row is tested
+    while not pixelCollision(bird, pipe.move(0, -1), bird_hitmask, pipe_hitmask):
+        pipe.top -= 1
+    return lambda: pixelCollision(bird, pipe, bird_hitmask, pipe_hitmask)
+
+
+@benchmark('check_crash')
+def bench_check_crash():
+    bird = new_bird()
+    # one pair around the bird, the bird flies through its gap
+    pipes = new_pipes((bird.rect.left - 10, bird.rect.top - 30), (bird.rect.left + 134, 150))
+    return lambda: game.check_crash(bird, pipes)
+
+
+@benchmark('check_crash_old')
+def bench_check_crash_old():
+    bird = new_bird()
+    player = {'index': 0, 'x': bird.rect.left, 'y': bird.rect.top}
+    pipe_height = IMAGES['pipe'][0].get_height()
+    # the same pairs as check_crash
+    pairs = [(bird.rect.left - 10, bird.rect.top - 30), (bird.rect.left + 134, 150)]
+    upper = [{'x': x, 'y': gap_y - pipe_height} for x, gap_y in pairs]
+    lower = [{'x': x, 'y': gap_y + game.PIPEGAPSIZE} for x, gap_y in pairs]
+    return lambda: check_crash_old(player, upper, lower)
+
+
+@benchmark('Bird.update')
+def bench_bird_update():
+    bird = new_bird()
+
+    def op():
+        if bird.rect.top > 300:
+            bird.rect.top = 100
+            bird.flap_once()
+        bird.update()
+    return op
+
+
+@benchmark('Bird.draw')
+def bench_bird_draw():
+    bird = new_bird()
+    return lambda: bird.draw(game.SCREEN)
+
+
+@benchmark('Bird.draw rotated')
+def bench_bird_draw_rotated():
+    bird = new_bird()
+
+    def op():
+        bird.rotation = bird.rotation - 3 if bird.rotation > -90 else 45
+        bird.draw(game.SCREEN, True)
+    return op
+
+
+@benchmark('get_random_pipes')
+def bench_get_random_pipes():
+    pipes = new_pipes()
+
+    def op():
+        game.get_random_pipes(pipes, game.SCREENWIDTH + 10)
+        pipes.remove_first()
+    return op
+
+
+@benchmark('showScore')
+def bench_show_score():
+    return lambda: game.showScore(123)
+
+
+def ops_per_second(op, min_time):
+    """runs op until it took min_time, doubling the number of calls"""
+    calls = 1
+    while True:
+        begin_time = time.perf_counter()
+        for _ in range(calls):
+            op()
+        elapsed = time.perf_counter() - begin_time
+        if elapsed >= min_time:
+            return calls / elapsed
+        calls *= 2
+
+
+def allocations(op, calls=1000):
+    """peak Python bytes of one call, and blocks still held after calls calls"""
+    op()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot()
+        for _ in range(calls):
+            op()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    retained = sum(stat.count_diff for stat in
+                   after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno'))
+    return peak - start, max(retained, 0)
+
+
+def run(names, min_time=0.2, repeat=3):
+    results = {}
+    for name in names:
+        op = BENCHMARKS[name]()
+        best = max(ops_per_second(op, min_time) for _ in range(repeat))
+        peak_bytes, retained_blocks = allocations(op)
+        results[name] = {
+            'ops_per_sec': best,
+            'peak_bytes': peak_bytes,
+            'retained_blocks': retained_blocks,
+        }
+        print('{:<20} {:>14,.0f} ops/s {:>10} B peak {:>6} blocks kept'.format(
+            name, best, peak_bytes, retained_blocks))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """returns the names of the benchmarks slower than the baseline by more than threshold"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec']
+        mark = ''
+        if ratio < 1 - threshold:
+            regressions.append(name)
+            mark = '  REGRESSION'
+        print('{:<20} {:>7.2f}x{}'.format(name, ratio, mark))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flappy Bird micro benchmarks')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, default all: ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds each timing runs at least')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', metavar='FILE', help='write the results as json')
+    parser.add_argument('--baseline', metavar='FILE', help='compare against the results in this json file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    setup_game()
+    results = run(args.names or list(BENCHMARKS), args.min_time, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'pygame': pygame.version.ver,
+                'platform': platform.platform(),
+                'results': results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Pixel collision for Flappy Bird
+
+A Hitmask keeps every row of an image as one int, bit x set when pixel x is
+solid, so two masks overlap when any pair of rows shifted by the x offset has
+a common bit. Masks are built from the whole pixel buffer instead of one
+get_at call per pixel.
+
+BirdPipeCollider answers "N birds against a pipe pair" with the same rows
+packed into NumPy uint64 arrays.
+"""
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # only BirdPipeCollider needs numpy
+    np = None
+
+
+class Hitmask:
+    def __init__(self, rows, width):
+        self.rows = tuple(rows)
+        self.width = width
+        self.height = len(self.rows)
+
+    @classmethod
+    def from_surface(cls, surface, threshold=127):
+        """
+        :param threshold: pixels with alpha above it are solid, 127 is the
+                          default of pygame.mask.from_surface
+        """
+        width, height = surface.get_size()
+        alpha = pygame.image.tostring(surface, 'RGBA')[3::4]
+        bits = bytes(ord('1') if a > threshold else ord('0') for a in range(256))
+        rows = []
+        for y in range(height):
+            # bit 0 is the leftmost pixel, so the string is read reversed
+            rows.append(int(alpha[y * width:(y + 1) * width].translate(bits)[::-1], 2))
+        return cls(rows, width)
+
+    def overlap(self, other, offset):
+        """returns True if other, placed at offset from this mask, overlaps it"""
+        dx, dy = offset
+        if dx >= self.width or dx <= -other.width:
+            return False
+        for y in range(max(0, dy), min(self.height, dy + other.height)):
+            row = other.rows[y - dy]
+            row = row << dx if dx >= 0 else row >> -dx
+            if self.rows[y] & row:
+                return True
+        return False
+
+    def to_mask(self):
+        """the same mask as a pygame.mask.Mask, for pygame.sprite.collide_mask"""
+        width, height = self.width, self.height
+        bits = ''.join(format(row, '0{}b'.format(width))[::-1] for row in self.rows).encode('ascii')
+        pixels = bytearray(4 * width * height)
+        pixels[3::4] = bits.translate(bytes(255 if b == ord('1') else 0 for b in range(256)))
+        return pygame.mask.from_surface(pygame.image.frombuffer(pixels, (width, height), 'RGBA'))
+
+    def __getitem__(self, x):
+        """column x as a list, same as the hitmasks of the old getHitmask"""
+        return [bool(row >> x & 1) for row in self.rows]
+
+
+class BirdPipeCollider:
+    """pixel collision of many birds against pipe pairs at once"""
+
+    def __init__(self, bird_hitmasks, upper_hitmask, lower_hitmask, gap_size):
+        if np is None:
+            raise ImportError('BirdPipeCollider requires numpy')
+        bird_hitmasks = tuple(bird_hitmasks)
+        assert all(m.width <= 64 for m in bird_hitmasks + (upper_hitmask, lower_hitmask))
+        self.bird_width = bird_hitmasks[0].width
+        self.bird_height = bird_hitmasks[0].height
+        self.pipe_width = upper_hitmask.width
+        self.pipe_height = upper_hitmask.height
+        self.gap_size = gap_size
+        # (flap index, row) of the bird frames
+        self._bird_rows = np.array([m.rows for m in bird_hitmasks], dtype=np.uint64)
+        # one empty row on each end, rows outside the pipe are clipped to them
+        self._upper_rows = np.array((0,) + upper_hitmask.rows + (0,), dtype=np.uint64)
+        self._lower_rows = np.array((0,) + lower_hitmask.rows + (0,), dtype=np.uint64)
+        self._row = np.arange(self.bird_height)
+
+    def _pipe_rows(self, table, pipe_top, bird_y):
+        index = bird_y[:, None] + self._row - pipe_top[:, None] + 1
+        return table[np.clip(index, 0, len(table) - 1)]
+
+    def hit(self, flap_index, bird_x, bird_y, pipe_x, gap_y):
+        """
+        all arguments are broadcast together, gap_y is the top of the gap
+        :return: bool array, True where the bird overlaps the upper or lower pipe
+        """
+        flap_index, bird_x, bird_y, pipe_x, gap_y = np.broadcast_arrays(
+            flap_index, bird_x, bird_y, pipe_x, gap_y)
+        shape = flap_index.shape
+        result = np.zeros(shape, dtype=bool)
+
+        # bounding boxes first, only the overlapping ones are tested by rows
+        dx = (pipe_x - bird_x).ravel()
+        bird_y = bird_y.ravel()
+        gap_y = gap_y.ravel()
+        near = ((dx < self.bird_width) & (dx > -self.pipe_width) &
+                ((bird_y < gap_y) | (bird_y + self.bird_height > gap_y + self.gap_size)))
+        rows = np.flatnonzero(near)
+        if not len(rows):
+            return result
+        dx, bird_y, gap_y = dx[rows], bird_y[rows], gap_y[rows]
+
+        # a bird can only reach into one of the two pipes
+        upper = bird_y < gap_y
+        pipe = np.where(upper[:, None],
+                        self._pipe_rows(self._upper_rows, gap_y - self.pipe_height, bird_y),
+                        self._pipe_rows(self._lower_rows, gap_y + self.gap_size, bird_y))
+        # move the pipe pixels into the bird columns
+        shift = np.abs(dx).astype(np.uint64)[:, None]
+        pipe = np.where(dx[:, None] >= 0, pipe << shift, pipe >> shift)
+        bird = self._bird_rows[flap_index.ravel()[rows]]
+        result.ravel()[rows] = (bird & pipe).any(axis=1)
+        return result
@@ -0,0 +1,56 @@
+"""
+Dirty rectangle rendering
+
+DirtyScreen wraps the display surface and remembers the rect of every blit in
+a frame. Instead of drawing the whole background, clear() copies the
+background back over the rects of the last frame only, and update() pushes
+just those rects and the new ones to the display.
+"""
+
+import pygame
+
+
+class DirtyScreen:
+    def __init__(self, surface):
+        self.surface = surface
+        self._rects = []  # blitted in this frame
+        self._last_rects = []  # blitted in the last frame
+        self._background = None
+        self._full = True  # next frame is drawn and updated as a whole
+
+    def __getattr__(self, name):
+        return getattr(self.surface, name)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = self.surface.blit(source, dest, area, special_flags)
+        self._rects.append(rect)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=1):
+        rects = self.surface.blits(blit_sequence, doreturn=1)
+        self._rects.extend(rects)
+        return rects if doreturn else None
+
+    def invalidate(self):
+        """redraw and update the whole screen in the next frame"""
+        self._full = True
+
+    def clear(self, background):
+        """restores the background where the last frame drew sprites"""
+        if self._full or background is not self._background:
+            self._background = background
+            self._full = True
+            self.surface.blit(background, (0, 0))
+        else:
+            for rect in self._last_rects:
+                self.surface.blit(background, rect, rect)
+
+    def update(self):
+        """updates the changed regions of the display"""
+        if self._full:
+            pygame.display.update()
+            self._full = False
+        else:
+            pygame.display.update(self._last_rects + self._rects)
+        self._last_rects = self._rects
+        self._rects = []
@@ -0,0 +1,164 @@
+"""
+Parallel agent evaluation
+
+Runs every (agent, seed) pair as one headless game and reports the score and
+the steps each game survived. The seeds are split into chunks, each chunk is
+played as one BatchFlappy in a worker process, and the workers write their
+results straight into a shared memory array, so only a few numbers per chunk
+go through the pool's pipes:
+    python evaluate.py --agents evaluate:follow_gap evaluate:random_flap --seeds 10000
+
+An agent is a function "module:name" taking the BatchFlappy and returning the
+flap array of this step, so one call decides for every game of the chunk.
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import batch_sim
+from batch_sim import BatchFlappy
+
+MAXFRAMES = 20000  # a game still alive after this many steps is stopped
+CHUNKSIZE = 512  # games per task
+
+
+def never(sim):
+    return np.zeros(sim.n, dtype=bool)
+
+
+_flap_rngs = weakref.WeakKeyDictionary()  # BatchFlappy -> one generator per game
+
+
+def random_flap(sim):
+    """flaps 8% of the steps, the same steps for a seed in any chunk and any run"""
+    rngs = _flap_rngs.get(sim)
+    if rngs is None:
+        seeds = sim.seeds if sim.seeds is not None else range(sim.n)
+        rngs = _flap_rngs[sim] = [np.random.default_rng(seed) for seed in seeds]
+    return np.array([rng.random() for rng in rngs]) < 0.08
+
+
+def follow_gap(sim):
+    """flaps whenever the bird gets within 10 pixels of the next lower pipe"""
+    _, gap_y = sim.next_pipe()
+    return sim.y + batch_sim.BIRDHEIGHT > gap_y + batch_sim.PIPEGAPSIZE - 10
+
+
+def load_agent(spec):
+    module, name = spec.split(':')
+    return getattr(importlib.import_module(module), name)
+
+
+_collider = None
+
+
+def _run_chunk(task):
+    """plays one chunk of seeds, the results go to the shared memory"""
+    global _collider
+    shm_name, total, offset, agent_spec, seeds, max_frames = task
+    if _collider is None:
+        _collider = batch_sim.load_collider()
+    agent = load_agent(agent_spec)
+
+    begin_time = time.perf_counter()
+    sim = BatchFlappy(len(seeds), collider=_collider, seeds=seeds)
+    for _ in range(max_frames):
+        sim.step(agent(sim))
+        if sim.crashed.all():
+            break
+    elapsed = time.perf_counter() - begin_time
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        results = np.ndarray((2, total), dtype=np.int32, buffer=shm.buf)
+        results[0, offset:offset + len(seeds)] = sim.score
+        results[1, offset:offset + len(seeds)] = sim.frames
+        del results
+    finally:
+        shm.close()
+    return len(seeds), int(sim.frames.sum()), elapsed
+
+
+def evaluate(agents, seeds, workers=None, max_frames=MAXFRAMES, chunksize=CHUNKSIZE):
+    """
+    plays every agent on every seed
+    :param agents: agent specs, "module:name"
+    :return: scores, frames: int arrays (agent, seed); stats: throughput dict
+    """
+    seeds = list(seeds)
+    total = len(agents) * len(seeds)
+    shm = shared_memory.SharedMemory(create=True, size=2 * total * np.dtype(np.int32).itemsize)
+    try:
+        tasks = []
+        for a, agent in enumerate(agents):
+            for i in range(0, len(seeds), chunksize):
+                tasks.append((shm.name, total, a * len(seeds) + i, agent, seeds[i:i + chunksize], max_frames))
+
+        begin_time = time.perf_counter()
+        busy_time = 0.0
+        steps = 0
+        with multiprocessing.Pool(workers) as pool:
+            for _, chunk_steps, elapsed in pool.imap_unordered(_run_chunk, tasks):
+                steps += chunk_steps
+                busy_time += elapsed
+        wall_time = time.perf_counter() - begin_time
+
+        results = np.ndarray((2, total), dtype=np.int32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    stats = {
+        'games': total,
+        'steps': steps,
+        'workers': workers or os.cpu_count(),
+        'wall_time': wall_time,
+        'games_per_second': total / wall_time,
+        'steps_per_second': steps / wall_time,
+        'steps_per_worker_second': steps / busy_time if busy_time else 0.0,
+    }
+    shape = (len(agents), len(seeds))
+    return results[0].reshape(shape), results[1].reshape(shape), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='evaluate Flappy Bird agents on many seeds')
+    parser.add_argument('--agents', nargs='+', default=['evaluate:follow_gap'],
+                        help='agent functions as module:name')
+    parser.add_argument('--seeds', type=int, default=1000, help='number of seeds')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, help='worker processes, default one per core')
+    parser.add_argument('--max-frames', type=int, default=MAXFRAMES)
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--out', help='write agent,seed,score,frames rows to this csv file')
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    scores, frames, stats = evaluate(args.agents, seeds, args.workers, args.max_frames, args.chunksize)
+
+    for agent, agent_scores, agent_frames in zip(args.agents, scores, frames):
+        print('{}: mean score {:.2f}, max score {}, mean frames {:.1f}'.format(
+            agent, agent_scores.mean(), agent_scores.max(), agent_frames.mean()))
+    print('{games} games, {steps} steps in {wall_time:.2f}s with {workers} workers: '
+          '{games_per_second:.0f} games/s, {steps_per_second:,.0f} steps/s '
+          '({steps_per_worker_second:,.0f} per worker)'.format(**stats))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write('agent,seed,score,frames\n')
+            for agent, agent_scores, agent_frames in zip(args.agents, scores, frames):
+                for seed, score, frame in zip(seeds, agent_scores, agent_frames):
+                    f.write('{},{},{},{}\n'.format(agent, seed, score, frame))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Ghost racing
+
+Draws earlier runs, played again from their replays, as see-through birds
+flying next to the live one:
+    python FlappyBird.py --record replays --ghosts replays
+
+GhostTracks plays all the replays once, together in a BatchFlappy for each
+bird and pipe the replays were played with, and keeps only the track of
+every ghost: its top y (int16) and its sprite (uint8, the
+bird image and the rotation) after every step, 3 bytes a ghost a step.
+GhostFrames holds the rotated images of a bird skin once, with the ghost
+alpha already multiplied in, so a frame of hundreds of ghosts is one
+blits() call over (sprite, position) pairs looked up in the tracks. No
+ghost has a Bird, and nothing is rotated or masked while playing.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pygame
+
+from batch_sim import BatchFlappy, MIN_ROTATION, PLAYERX, load_collider, replay_flaps
+from FlappyBird import PLAYERS_LIST, PIPES_LIST
+from replay import Replay
+
+GHOSTALPHA = 70  # 0 invisible, 255 as solid as the live bird
+MAXGHOSTS = 500  # the best runs are the ghosts
+MAXFRAMES = 20000  # tracks stop after this many steps
+ROTATION_THRESHOLD = 20  # Bird.rotation_threshold, the bird is drawn turned up by at most this
+ANGLE_STEP = 3  # BirdFrames.ANGLE_STEP
+# every angle a flying bird is drawn at, the angles of BirdFrames.quantize
+ANGLES = list(range(MIN_ROTATION, ROTATION_THRESHOLD, ANGLE_STEP)) + [ROTATION_THRESHOLD]
+
+
+def sprite_index(flap_index, rotation):
+    """sprite numbers of GhostFrames for the image indexes and rotations of birds"""
+    angle = np.round((np.minimum(rotation, ROTATION_THRESHOLD) - ANGLES[0]) / ANGLE_STEP).astype(np.int32)
+    return np.asarray(flap_index, dtype=np.int32) * len(ANGLES) + np.minimum(angle, len(ANGLES) - 1)
+
+
+class GhostFrames:
+    """see-through rotated images of a bird skin, in the order of sprite_index"""
+
+    def __init__(self, bird_frames, alpha=GHOSTALPHA):
+        """
+        :param bird_frames: BirdFrames of the skin, its rotated images are reused
+        """
+        self.sprites = []
+        for index in range(len(bird_frames.images)):
+            for angle in ANGLES:
+                image = bird_frames.rotated(index, angle).copy()
+                image.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+                self.sprites.append(image)
+
+
+class GhostTracks:
+    def __init__(self, replays, max_frames=MAXFRAMES):
+        """
+        plays the replays in a BatchFlappy and records where every bird flies
+        :param replays: finished runs, crash_frame >= 0
+        """
+        self.replays = list(replays)
+        n = len(self.replays)
+        frames = min(max([r.crash_frame for r in self.replays], default=-1) + 1, max_frames)
+        self.y = np.zeros((frames + 1, n), dtype=np.int16)  # top after each step, row 0 the start
+        self.sprite = np.zeros((frames + 1, n), dtype=np.uint8)
+        self.end = np.full(n, frames, dtype=np.int32)  # last step a ghost is drawn after, its crash
+
+        # the masks of the bird and pipe decide the crashes
+        groups = {}
+        for i, r in enumerate(self.replays):
+            groups.setdefault((r.player_index, r.pipe_index), []).append(i)
+        for (player_index, pipe_index), columns in groups.items():
+            self._play(np.array(columns), load_collider(player_index, pipe_index), frames)
+
+    def _play(self, columns, collider, frames):
+        """records the tracks of the replays in columns, all played with collider"""
+        replays = [self.replays[i] for i in columns]
+        sim = BatchFlappy(len(replays), collider=collider, seeds=[r.seed for r in replays])
+        sim.reset(None, [r.start_y for r in replays], [r.anim_steps for r in replays])
+        self._record(sim, 0, columns)
+
+        for t, flap in enumerate(replay_flaps(replays, frames)):
+            crash, _ = sim.step(flap)
+            self.end[columns[crash]] = t
+            self._record(sim, t + 1, columns)
+            if sim.crashed.all():
+                break
+
+    def _record(self, sim, row, columns):
+        self.y[row, columns] = sim.y
+        self.sprite[row, columns] = sprite_index(sim.flap_index, sim.rotation)
+
+    def __len__(self):
+        return len(self.replays)
+
+    def draw(self, surface, frames, step, alpha=1.0):
+        """
+        draws the ghosts flying after step steps, all in one call
+        :param frames: GhostFrames of the skin to draw them with
+        :param alpha: between the last two steps, as Bird.blit
+        """
+        if step >= len(self.y):
+            return
+        flying = np.flatnonzero(self.end >= step)
+        if not len(flying):
+            return
+        y = self.y[step, flying]
+        if step and alpha < 1.0:
+            last = self.y[step - 1, flying]
+            y = last + (y - last) * alpha
+        sprites = frames.sprites
+        blits = [(sprites[s], (PLAYERX, top)) for s, top in zip(self.sprite[step, flying].tolist(), y.tolist())]
+        surface.blits(blits, False)
+
+
+def load(directory, count=MAXGHOSTS):
+    """the tracks of the count best finished replays in directory"""
+    replays = []
+    for path in glob.glob(os.path.join(directory, '*.fbr')):
+        try:
+            replay = Replay.load(path)
+        except (ValueError, IndexError):
+            continue  # not a replay, or cut short
+        if replay.crash_frame >= 0 and replay.player_index < len(PLAYERS_LIST) and replay.pipe_index < len(PIPES_LIST):
+            replays.append(replay)
+    replays.sort(key=lambda r: r.score, reverse=True)
+    return GhostTracks(replays[:count])
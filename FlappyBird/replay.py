@@ -0,0 +1,102 @@
+"""
+Replays
+
+A replay is everything needed to play a run of main_game again: the seed of
+the pipe gaps, where the bird starts, the bird and pipe images (their masks
+decide the crashes) and the steps where the player flapped. Flaps come in
+short bursts between long pauses, so they are stored as runs (steps since
+the last run, run length), all numbers as varints:
+    b'FBR' version seed start_y anim_steps player_index pipe_index score crash_frame
+    run_count (gap length)*
+
+verify_replays.py checks the claimed score and crash frame of replays.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gamekit import varint
+
+MAGIC = b'FBR'
+VERSION = 1
+
+
+class Replay:
+    def __init__(self, seed, start_y, anim_steps, flaps=(), score=0, crash_frame=-1, player_index=0, pipe_index=0):
+        """
+        :param seed: seed of the pipe gap random generator
+        :param start_y: top of the bird when main_game starts
+        :param anim_steps: Bird.animate calls before main_game starts
+        :param flaps: steps of main_game where the player flapped, ascending
+        :param score, crash_frame: the result claimed for the run
+        :param player_index, pipe_index: the images of PLAYERS_LIST and PIPES_LIST
+        """
+        self.seed = seed
+        self.start_y = start_y
+        self.anim_steps = anim_steps
+        self.flaps = list(flaps)
+        self.score = score
+        self.crash_frame = crash_frame
+        self.player_index = player_index
+        self.pipe_index = pipe_index
+
+    def flap(self, step):
+        self.flaps.append(step)
+
+    def finish(self, score, crash_frame):
+        self.score = score
+        self.crash_frame = crash_frame
+
+    def runs(self):
+        """the flaps as (steps since the end of the last run, run length)"""
+        runs = []
+        end = 0
+        for step in self.flaps:
+            if runs and step == end:
+                runs[-1][1] += 1
+            else:
+                runs.append([step - end, 1])
+            end = step + 1
+        return runs
+
+    def encode(self):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        for value in (self.seed, varint.zigzag(self.start_y), self.anim_steps, self.player_index, self.pipe_index,
+                      self.score, self.crash_frame + 1):
+            varint.put(out, value)
+        runs = self.runs()
+        varint.put(out, len(runs))
+        for gap, length in runs:
+            varint.put(out, gap)
+            varint.put(out, length)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data):
+        if data[:3] != MAGIC or data[3] != VERSION:
+            raise ValueError('not a version {} replay'.format(VERSION))
+        pos = 4
+        values = []
+        for _ in range(8):
+            value, pos = varint.get(data, pos)
+            values.append(value)
+        seed, start_y, anim_steps, player_index, pipe_index, score, crash_frame, run_count = values
+        flaps = []
+        end = 0
+        for _ in range(run_count):
+            gap, pos = varint.get(data, pos)
+            length, pos = varint.get(data, pos)
+            flaps.extend(range(end + gap, end + gap + length))
+            end += gap + length
+        return cls(seed, varint.unzigzag(start_y), anim_steps, flaps, score, crash_frame - 1, player_index, pipe_index)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.decode(f.read())
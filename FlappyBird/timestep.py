@@ -0,0 +1,52 @@
+"""
+Fixed timestep
+
+The game logic always advances in steps of 1/step_rate seconds, whatever the
+frame rate is. Each frame the elapsed time is added to an accumulator and as
+many whole steps as it holds are run; the remainder, as a fraction of a step
+(alpha), tells the drawing code how far to interpolate between the last two
+steps.
+"""
+
+
+class FixedStep:
+    def __init__(self, clock, step_rate, render_fps=None, max_steps=5):
+        """
+        :param render_fps: frames per second to draw, None runs exactly one
+                           step per frame at step_rate
+        :param max_steps: most steps run in one frame, a slow frame drops the
+                          time beyond it instead of falling further behind
+        """
+        self.clock = clock
+        self.step_rate = step_rate
+        self.step_time = 1.0 / step_rate
+        self.render_fps = render_fps
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.dropped_steps = 0
+
+    def tick(self):
+        """waits for the next frame, returns the number of steps to run"""
+        if self.render_fps is None:
+            self.clock.tick(self.step_rate)
+            return 1
+
+        self.accumulator += self.clock.tick(self.render_fps) / 1000.0
+        steps = int(self.accumulator / self.step_time)
+        if steps > self.max_steps:
+            self.dropped_steps += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulator = steps * self.step_time
+        self.accumulator -= steps * self.step_time
+        self.alpha = self.accumulator / self.step_time
+        return steps
+
+    def reset(self):
+        """forgets the time since the last tick, after the game was paused"""
+        self.clock.tick()
+        self.accumulator = 0.0
+
+
+def lerp(last, current, alpha):
+    return last + (current - last) * alpha
@@ -0,0 +1,92 @@
+"""
+Replay verifier
+
+verify() checks the claimed score and crash frame of many replays at once by
+stepping them together in a BatchFlappy, with no display, clock or sprites.
+Replays of the same bird and pipe images share a BatchFlappy with the masks
+of those images:
+    python verify_replays.py replays/*.fbr
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import batch_sim
+from batch_sim import BatchFlappy, replay_flaps
+from FlappyBird import PLAYERS_LIST, PIPES_LIST
+from replay import Replay
+
+MAXFRAMES = 10 ** 6  # longer claims are rejected without simulating
+
+
+_colliders = {}  # (player_index, pipe_index) -> BirdPipeCollider
+
+
+def _collider(player_index, pipe_index):
+    key = (player_index, pipe_index)
+    if key not in _colliders:
+        _colliders[key] = batch_sim.load_collider(player_index, pipe_index)
+    return _colliders[key]
+
+
+def verify(replays, max_frames=MAXFRAMES):
+    """
+    plays all the replays again
+    :return: bool array, True for the replays whose score and crash frame are right
+    """
+    valid = np.zeros(len(replays), dtype=bool)
+    groups = {}
+    for i, r in enumerate(replays):
+        if r.player_index < len(PLAYERS_LIST) and r.pipe_index < len(PIPES_LIST):
+            groups.setdefault((r.player_index, r.pipe_index), []).append(i)
+    for key, rows in groups.items():
+        valid[rows] = _verify([replays[i] for i in rows], _collider(*key), max_frames)
+    return valid
+
+
+def _verify(replays, collider, max_frames):
+    """verify() of replays with the same images"""
+    n = len(replays)
+    claims = np.array([r.crash_frame for r in replays])
+    valid = (claims >= 0) & (claims <= max_frames)
+    frames = int(claims[valid].max()) + 1 if valid.any() else 0
+
+    sim = BatchFlappy(n, collider=collider, seeds=[r.seed for r in replays])
+    sim.reset(None, [r.start_y for r in replays], [r.anim_steps for r in replays])
+    sim.crashed[~valid] = True
+
+    crash_frame = np.full(n, -1)
+    for t, flap in enumerate(replay_flaps(replays, frames)):
+        crash, _ = sim.step(flap)
+        crash_frame[crash] = t
+        if sim.crashed.all():
+            break
+
+    return valid & (crash_frame == claims) & (sim.score == [r.score for r in replays])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='verify Flappy Bird replays')
+    parser.add_argument('replays', nargs='+', help='replay files')
+    parser.add_argument('--batch', type=int, default=4096, help='replays simulated together')
+    args = parser.parse_args()
+
+    begin_time = time.perf_counter()
+    failed = 0
+    for i in range(0, len(args.replays), args.batch):
+        paths = args.replays[i:i + args.batch]
+        for path, ok in zip(paths, verify([Replay.load(path) for path in paths])):
+            if not ok:
+                failed += 1
+                print('FAILED', path)
+    total_time = time.perf_counter() - begin_time
+    print('{} replays, {} failed, {:.0f} replays/s'.format(
+        len(args.replays), failed, len(args.replays) / total_time))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
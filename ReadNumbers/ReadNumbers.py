@@ -16,14 +16,33 @@ v1.2
     加入级别提升功能，状态栏显示级别
     调整字体大小
     将游戏结束画面从game playing中独立出来，形成start/playing/end三个独立阶段
+v1.3
+    方块区只在开局时画到一个离屏surface上，之后只重画被点中的方块和变化的时间，
+    只更新这些区域(dirty rects)
+v1.4
+    方块的数字和状态存成数组(board.py)，点击直接算出方块位置，不再逐个检查
+    支持超大方块区(--grid 100x100)：滚轮缩放，右键拖动或方向键平移，只画看得见的方块
+v1.5
+    开始和结束画面不再按FPS轮询重画，画一次后阻塞等待事件
+v1.6
+    --click-log记录每次点击的纳秒时间戳和反应时间(telemetry.py)，用analyze_clicks.py分析
 """
 
 import pygame
 from pygame.locals import *
+import argparse
+import atexit
+import os
 import sys
-import random
 import time
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gamekit import profiler, startup, text
+from gamekit.idle import IdleWait
+from gamekit.loader import AssetLoader
+from board import Board, HIDDEN, FOUND, ZOOMSTEP
+from telemetry import ClickLog, NullClickLog
+
 # 窗口及方块尺寸
 WINDOWWIDTH = 800
 WINDOWHEIGHT = 600
@@ -32,7 +51,15 @@ GAMEMARGIN = 20  # 方块区距离状态栏距离
 
 
 TEXTSIZE = 60  # 字体大小
+MINTEXTBOXSIZE = 14  # 方块小于这个尺寸时不显示数字
 BUTTONTEXTSIZE = 60
+BOXBORDER = 5  # 方块边框宽度
+PANSTEP = 40  # 方向键每次平移的像素
+PANKEYS = {K_LEFT: (PANSTEP, 0), K_RIGHT: (-PANSTEP, 0), K_UP: (0, PANSTEP), K_DOWN: (0, -PANSTEP)}
+FONTPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sources', 'ArchitectsDaughter-Regular.ttf')
+# 字体在后台线程打开, the start screen's first, the rest while it is shown
+STARTFONTS = ((FONTPATH, 80, False), (FONTPATH, BUTTONTEXTSIZE, False))
+LATERFONTS = ((FONTPATH, 40, False), ("", 60, True))
 
 FPS = 30
 
@@ -56,6 +83,10 @@ BOXCOLOR = WHITE  # 方块背景色
 BOXBORDERCOLOR = BLACK
 TEXTCOLOR = BLACK  # 文字颜色
 BUTTONCOLOR = GRAY  # 方块边框颜色
+STATECOLORS = {HIDDEN: BOXCOLOR, FOUND: LIGHTBOXCOLOR}
+
+PROFILER = profiler.NullProfiler()
+CLICKLOG = NullClickLog()
 
 
 def draw_button(text, centerx, centery):
@@ -68,15 +99,17 @@ def draw_button(text, centerx, centery):
 def draw_start_screen():
     DISPLAYSURF.fill(BGCOLOR)
     # draw title
-    font = pygame.font.Font(r".\sources\ArchitectsDaughter-Regular.ttf", 80)
-    text_surf = font.render(u'Count The Numbers', True, RED)
+    text_surf = text.render(u'Count The Numbers', 80, RED, FONTPATH)
     text_rect = text_surf.get_rect()
     text_rect.center = (400, 200)
     DISPLAYSURF.blit(text_surf, text_rect)
     # draw button
     start_rect = draw_button('START', 400, 400)
+    pygame.display.update()
+    startup.first_frame()
+    idle = IdleWait()
     while True:
-        for event in pygame.event.get():
+        for event in idle.poll(animating=False):
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
@@ -86,8 +119,8 @@ def draw_start_screen():
                 mousex, mousey = event.pos
                 if start_rect.collidepoint(mousex, mousey):
                     return True
-        pygame.display.update()
-        FPSCLOCK.tick(FPS)
+        if idle.exposed:
+            pygame.display.update()
 
 
 def draw_end_screen(score):
@@ -95,13 +128,14 @@ def draw_end_screen(score):
     replay_rect = draw_button('REPLAY', 400, 280)
     next_rect = draw_button('NEXT', 400, 400)
     quit_rect = draw_button('QUIT', 400, 520)
-    font = pygame.font.Font(".\sources\ArchitectsDaughter-Regular.ttf", 40)
-    text_surf = font.render('Your Score is:  '+str(score) + '   seconds.', True, BLUE)
+    text_surf = text.render('Your Score is:  '+str(score) + '   seconds.', 40, BLUE, FONTPATH)
     text_rect = text_surf.get_rect()
     text_rect.center = (400, 100)
     DISPLAYSURF.blit(text_surf, text_rect)
+    pygame.display.update()
+    idle = IdleWait()
     while True:
-        for event in pygame.event.get():
+        for event in idle.poll(animating=False):
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
@@ -113,77 +147,116 @@ def draw_end_screen(score):
                     return 'next'
                 elif quit_rect.collidepoint(mousex, mousey):
                     return 'quit'
-        pygame.display.update()
-        FPSCLOCK.tick(FPS)
+        if idle.exposed:
+            pygame.display.update()
 
 
-def game_playing(level=1):
+def game_playing(level=1, grid=None):
     # 初始化
-    board_nums, board_colors, board_rects, begin_time, cur_num, win_num = init_game(level)
-    mousex, mousey = 0, 0
-    total_time = 0
+    board, begin_time, cur_num, win_num, board_surf = init_game(level, grid)
+    viewport = board.viewport
+    dragging = False
+    DISPLAYSURF.blit(board_surf, (0, 0))
+    total_time = draw_status(level, begin_time)
+    pygame.display.update()
+    CLICKLOG.start_game(level, board.columns, board.rows)
 
     while True:  # main game loop
-        mouse_clicked = False
-        DISPLAYSURF.fill(BGCOLOR)
+        PROFILER.begin_frame()
+        clicks = []
+        view_changed = False  # 缩放或平移过，要重画整个方块区
+        dirty_rects = []  # 本帧需要更新的区域
+        PROFILER.phase('event')
         for event in pygame.event.get():
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
-            elif event.type == MOUSEBUTTONDOWN:
-                mouse_clicked = True
-                mousex, mousey = event.pos
-        if mouse_clicked:
+            elif event.type == MOUSEBUTTONDOWN and event.button == 1:
+                clicks.append(event.pos)
+            elif event.type == MOUSEBUTTONDOWN and event.button == 3:
+                dragging = True
+            elif event.type == MOUSEBUTTONUP and event.button == 3:
+                dragging = False
+            elif event.type == MOUSEMOTION and dragging:
+                board.pan(*event.rel)
+                view_changed = True
+            elif event.type == MOUSEWHEEL and event.y:
+                view_changed |= board.zoom(ZOOMSTEP ** event.y, pygame.mouse.get_pos())
+            elif event.type == KEYDOWN and event.key in (K_EQUALS, K_PLUS, K_KP_PLUS):
+                view_changed |= board.zoom(ZOOMSTEP)
+            elif event.type == KEYDOWN and event.key in (K_MINUS, K_KP_MINUS):
+                view_changed |= board.zoom(1 / ZOOMSTEP)
+            elif event.type == KEYDOWN and event.key in PANKEYS:
+                board.pan(*PANKEYS[event.key])
+                view_changed = True
+        PROFILER.phase('collision')
+        for mousex, mousey in clicks:
             # 检查点击正确方块
-            for i, box in enumerate(board_rects):
-                if box.collidepoint(mousex, mousey) and board_nums[i] == cur_num:
-                    board_colors[i] = LIGHTBOXCOLOR
-                    if cur_num == win_num:  # 判断是否获胜
-                        return 'win', total_time
-                    else:
-                        cur_num += 1
-        draw_gameboard(board_rects, board_colors, board_nums)
-        total_time = draw_status(level, begin_time)
-        pygame.display.update()
+            i = board.cell_at(mousex, mousey)
+            correct = i >= 0 and board.nums[i] == cur_num
+            CLICKLOG.click(i, cur_num, correct)
+            if correct:
+                board.states[i] = FOUND
+                if cur_num == win_num:  # 判断是否获胜
+                    PROFILER.end_frame()
+                    return 'win', total_time
+                else:
+                    cur_num += 1
+                # 只重画这个方块
+                box = draw_cell(board, i, board_surf).clip(viewport)
+                DISPLAYSURF.blit(board_surf, box, box)
+                dirty_rects.append(box)
+        PROFILER.phase('draw')
+        if view_changed:
+            draw_gameboard(board, board_surf)
+            DISPLAYSURF.blit(board_surf, viewport, viewport)
+            dirty_rects = [viewport]
+        if PROFILER.hud:
+            # the overlay covers the board, redraw everything under it
+            DISPLAYSURF.blit(board_surf, (0, 0))
+            total_time = draw_status(level, begin_time)
+            PROFILER.draw_hud(DISPLAYSURF)
+            dirty_rects = [DISPLAYSURF.get_rect()]
+        elif int(time.time() - begin_time) != total_time:  # 时间每秒才变化一次
+            total_time = draw_status(level, begin_time)
+            dirty_rects.append(Rect(0, 0, WINDOWWIDTH, STATUSHEIGHT))
+        PROFILER.phase('flip')
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        PROFILER.phase('tick')
         FPSCLOCK.tick(FPS)
+        PROFILER.end_frame()
 
 
-def init_game(level=1):
+def init_game(level=1, grid=None):
     """
     :param level: 游戏级别
-    :return: nums, box_colors, box_rect: 游戏区域方块包含的数字，颜色，位置
+    :param grid: (横向, 纵向)方块数量，默认由级别决定
+    :return: board: 方块区，包含方块的数字，状态和位置
             start_time: 本局游戏的开始时间
             start_number: 开始需要点击的方块数字
             numbers: 方块数量，用于判断胜利条件，是否全部点击
+            board_surf: 画好背景和看得见的方块的离屏surface，和窗口一样大
     """
-    row = 2 + level // 3  # 纵向方块数量
-    column = 2 + level - level // 3  # 横向方块数量
-    totalboxsize = min(WINDOWWIDTH // column, (WINDOWHEIGHT - STATUSHEIGHT) // row)  # 方块加上周围MARGIN的尺寸
-    boxmargin = int(totalboxsize * 0.1)  # 方块外围的MARGIN，是方块间距离的一半
-    boxsize = totalboxsize - 2 * boxmargin  # 实际方块的尺寸
-    boardwidth = 5  # 方块边框宽度
-
-    margintop = STATUSHEIGHT + (WINDOWHEIGHT - STATUSHEIGHT - totalboxsize * row) // 2  # 方块区距离窗口上边的距离
-    marginleft = (WINDOWWIDTH - totalboxsize * column) // 2  # 方块区距离窗口左边的距离
-
-    numbers = column * row  # 方块数量
-
-    nums = [i + 1 for i in range(numbers)]
-    random.shuffle(nums)
-    box_colors = [BOXCOLOR] * numbers  # 方块颜色
-    box_rects = []  # 方块位置 Rect对象
-    for i in range(numbers):
-        box = Rect(marginleft + totalboxsize * (i % column) + boxmargin, margintop + totalboxsize * (i // column) + boxmargin, boxsize, boxsize)
-        box_rects.append(box)
+    if grid:
+        column, row = grid
+    else:
+        row = 2 + level // 3  # 纵向方块数量
+        column = 2 + level - level // 3  # 横向方块数量
+    board = Board(column, row, (0, STATUSHEIGHT, WINDOWWIDTH, WINDOWHEIGHT - STATUSHEIGHT))
+    # 每帧画的数字都要留在缓存里
+    text.reserve(board.max_visible(MINTEXTBOXSIZE))
+
+    board_surf = pygame.Surface(DISPLAYSURF.get_size()).convert()
+    draw_gameboard(board, board_surf)
     start_time = time.time()
     start_number = 1
-    return nums, box_colors, box_rects, start_time, start_number, numbers
+    return board, start_time, start_number, len(board), board_surf
 
 
 def draw_status(level, begin_time):
     pygame.draw.rect(DISPLAYSURF, LIGHTGRAY, (0, 0, WINDOWWIDTH, STATUSHEIGHT))
-    font = pygame.font.SysFont("", 60)
-    level_surf = font.render('LEVLE {}'.format(level), True, RED)
+    level_surf = text.render('LEVLE {}'.format(level), 60, RED, "", sysfont=True)
     level_rect = level_surf.get_rect()
     level_rect.midleft = 20, STATUSHEIGHT // 2
     DISPLAYSURF.blit(level_surf, level_rect)
@@ -192,35 +265,76 @@ def draw_status(level, begin_time):
 
 def draw_time_consuming(begin_time):
     total_time = int(time.time() - begin_time)
-    font = pygame.font.SysFont("", 60)
-    time_surf = font.render("TIME: "+str(total_time), True, RED)
+    time_surf = text.render("TIME: "+str(total_time), 60, RED, "", sysfont=True)
     time_rect = time_surf.get_rect()
     time_rect.midright = WINDOWWIDTH - 20, STATUSHEIGHT // 2
     DISPLAYSURF.blit(time_surf, time_rect)
     return total_time
 
 
-def draw_gameboard(box_rects, box_colors, box_nums):
-    for rect, bgcolor, num in zip(box_rects, box_colors, box_nums):
-        draw_rect(rect, num, TEXTSIZE, bgcolor)
-
-
-def draw_rect(box_rect, num, text_size, bgcolor, border_color=BOXBORDERCOLOR):
-    pygame.draw.rect(DISPLAYSURF, border_color, box_rect, 5)
-    pygame.draw.rect(DISPLAYSURF, bgcolor, box_rect.inflate(-5, -5))
-    font = pygame.font.Font(".\sources\ArchitectsDaughter-Regular.ttf", text_size)
-    text_surf = font.render(str(num), True, TEXTCOLOR)
+def draw_gameboard(board, surface):
+    """画方块区中看得见的方块"""
+    surface.fill(BGCOLOR, board.viewport)
+    surface.set_clip(board.viewport)
+    for i in board.visible_cells():
+        draw_cell(board, i, surface)
+    surface.set_clip(None)
+
+
+def draw_cell(board, i, surface):
+    box_size = board.box_size
+    box_rect = board.cell_rect(i)
+    bgcolor = STATECOLORS[board.states[i]]
+    if box_size < MINTEXTBOXSIZE:
+        # 太小了，只画颜色
+        border = max(box_size // 8, 1)
+        surface.fill(BOXBORDERCOLOR, box_rect)
+        if box_size > 2 * border:
+            surface.fill(bgcolor, box_rect.inflate(-2 * border, -2 * border))
+    else:
+        border = BOXBORDER if box_size >= 8 * BOXBORDER else max(box_size // 8, 1)
+        draw_rect(box_rect, board.nums[i], min(TEXTSIZE, box_size), bgcolor, border=border, surface=surface)
+    return box_rect
+
+
+def draw_rect(box_rect, num, text_size, bgcolor, border_color=BOXBORDERCOLOR, border=BOXBORDER, surface=None):
+    """画一个方块，surface默认为窗口"""
+    if surface is None:
+        surface = DISPLAYSURF
+    pygame.draw.rect(surface, border_color, box_rect, border)
+    pygame.draw.rect(surface, bgcolor, box_rect.inflate(-border, -border))
+    text_surf = text.render(num, text_size, TEXTCOLOR, FONTPATH)
     text_rect = text_surf.get_rect()
     text_rect.center = box_rect.center
-    DISPLAYSURF.blit(text_surf, text_rect)
-
-
-if __name__ == "__main__":
-    global DISPLAYSURF, FPSCLOCK
-    pygame.init()
+    surface.blit(text_surf, text_rect)
+
+
+def run(argv=None):
+    """parses the command line and plays, the entry point of the launcher"""
+    global DISPLAYSURF, FPSCLOCK, PROFILER, CLICKLOG
+    parser = argparse.ArgumentParser(description='Read The Numbers')
+    parser.add_argument('--grid', metavar='COLUMNSxROWS',
+                        help='play a board of this size instead of the levels, e.g. 100x100')
+    parser.add_argument('--click-log', metavar='FILE',
+                        help='append every click with its reaction time to FILE, see analyze_clicks.py')
+    parser.add_argument('--player', default='player', help='player name written to the click log')
+    profiler.add_arguments(parser)
+    args = parser.parse_args(argv)
+    PROFILER = profiler.from_arguments(args)
+    if args.click_log:
+        CLICKLOG = ClickLog(args.click_log)
+        CLICKLOG.start_session(args.player)
+        atexit.register(CLICKLOG.close)
+    grid = tuple(int(n) for n in args.grid.lower().split('x')) if args.grid else None
+
+    startup.init('display', 'font')
+    loader = AssetLoader()
+    text.load_async(loader, STARTFONTS)
+    text.load_async(loader, LATERFONTS, priority=1)
     DISPLAYSURF = pygame.display.set_mode((800, 600))
     FPSCLOCK = pygame.time.Clock()
     pygame.display.set_caption('Read The Numbers!')
+    startup.phase('first frame')
 
     # 开始画面
     draw_start_screen()
@@ -228,7 +342,7 @@ if __name__ == "__main__":
 
     while True:
         # 游戏进行
-        game_result, total_time = game_playing(level)
+        game_result, total_time = game_playing(level, grid)
         # 结束画面，选择下一动作
         next_operation = draw_end_screen(total_time)
         if next_operation == 'replay':
@@ -237,4 +351,8 @@ if __name__ == "__main__":
             level += 1
         elif next_operation == 'quit':
             pygame.quit()
-sys.exit()
\ No newline at end of file
+            return
+
+
+if __name__ == "__main__":
+    run()
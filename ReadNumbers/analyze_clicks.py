@@ -0,0 +1,111 @@
+"""
+Reaction times from click logs
+
+Streams one or more logs written with ReadNumbers.py --click-log and prints
+the reaction time distribution of every player and level: the time from one
+right click (or from the board being shown) to the next right click, and how
+many of the clicks were wrong (the error rate):
+    python analyze_clicks.py clicks.rncl
+    python analyze_clicks.py clicks.rncl --by player --csv times.csv
+"""
+
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gamekit.stats import percentiles
+from telemetry import read_records
+
+
+class Distribution:
+    def __init__(self):
+        self.latencies = []  # ms of the right clicks
+        self.wrong = 0
+        self.games = 0
+
+    def add(self, latency_ms):
+        self.latencies.append(latency_ms)
+
+    def summary(self):
+        values = sorted(self.latencies)
+        clicks = len(values) + self.wrong
+        summary = {
+            'games': self.games,
+            'clicks': clicks,
+            'error_rate': self.wrong / clicks if clicks else 0.0,
+        }
+        if values:
+            summary.update({
+                'mean': sum(values) / len(values),
+                'min': values[0],
+            })
+            summary.update(percentiles(values, (50, 90, 99, 100)))
+        return summary
+
+
+def analyze(paths, by=('player', 'level')):
+    """
+    :param by: what to group the clicks by, any of 'player' and 'level'
+    :return: {group key: Distribution}
+    """
+    distributions = defaultdict(Distribution)
+    for path in paths:
+        player, level = '', 0
+        for record in read_records(path):
+            kind = record[0]
+            if kind == 'click':
+                _, _, cell, expected, correct, latency = record
+                distribution = distributions[_key(by, player, level)]
+                if correct:
+                    distribution.add(latency / 1e6)
+                else:
+                    distribution.wrong += 1
+            elif kind == 'game':
+                level = record[2]
+                distributions[_key(by, player, level)].games += 1
+            elif kind == 'session':
+                player = record[2]
+    return distributions
+
+
+def _key(by, player, level):
+    return tuple(player if name == 'player' else level for name in by)
+
+
+COLUMNS = ('games', 'clicks', 'error_rate', 'mean', 'min', 'p50', 'p90', 'p99', 'max')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='reaction times from ReadNumbers click logs')
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--by', nargs='+', choices=('player', 'level'), default=['player', 'level'],
+                        help='group the clicks by player and/or level')
+    parser.add_argument('--csv', metavar='FILE', help='also write the table as csv')
+    args = parser.parse_args()
+
+    distributions = analyze(args.logs, args.by)
+    rows = [(key, distributions[key].summary()) for key in sorted(distributions)]
+
+    print(''.join('{:<12}'.format(name) for name in args.by) +
+          '{:>6}{:>7}{:>11}{:>9}{:>9}{:>9}{:>9}{:>9}{:>9}'.format('games', 'clicks', 'error rate', *COLUMNS[3:]))
+    for key, summary in rows:
+        line = ''.join('{:<12}'.format(str(value)[:11]) for value in key)
+        line += '{games:>6}{clicks:>7}{error_rate:>11.1%}'.format(**summary)
+        line += ''.join('{:>9.1f}'.format(summary[name]) if name in summary else '{:>9}'.format('-')
+                        for name in COLUMNS[3:])
+        print(line)
+    print('times in ms')
+
+    if args.csv:
+        with open(args.csv, 'w') as f:
+            f.write(','.join(list(args.by) + list(COLUMNS)) + '\n')
+            for key, summary in rows:
+                f.write(','.join([str(value) for value in key] +
+                                 [str(summary.get(name, '')) for name in COLUMNS]) + '\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
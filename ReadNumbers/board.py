@@ -0,0 +1,135 @@
+"""
+Board layout
+
+The boxes sit on a regular grid, so the board is kept as two flat arrays,
+the number and the state of every box, indexed by row * columns + column,
+plus the grid math: where the grid starts on screen and how big a cell is.
+Finding the box under the mouse is a division instead of a scan over all
+boxes, and only the cells inside the viewport are ever drawn. Zooming changes
+the cell size and panning moves the origin, so 100x100 boards work like 3x2
+ones.
+"""
+
+import random
+from array import array
+
+from pygame import Rect
+
+HIDDEN = 0  # 还没点中的方块
+FOUND = 1  # 已经按顺序点中的方块
+
+MARGINRATIO = 0.1  # 方块外围的MARGIN占格子的比例
+MINCELLSIZE = 4  # 缩小时格子的最小尺寸
+MAXCELLSIZE = 260  # 放大时格子的最大尺寸
+ZOOMSTEP = 1.25
+
+
+class Board:
+    def __init__(self, columns, rows, viewport):
+        """
+        :param columns, rows: 横向和纵向的方块数量
+        :param viewport: 窗口中显示方块区的Rect
+        """
+        self.columns = columns
+        self.rows = rows
+        self.viewport = Rect(viewport)
+        count = columns * rows
+        nums = list(range(1, count + 1))
+        random.shuffle(nums)
+        self.nums = array('I', nums)  # 方块包含的数字
+        self.states = bytearray(count)  # HIDDEN or FOUND
+        self.fit_size = max(min(self.viewport.width // columns, self.viewport.height // rows), 1)
+        self.cell_size = self.fit_size
+        self.originx = self.originy = 0
+        self.center()
+
+    def __len__(self):
+        return len(self.nums)
+
+    @property
+    def margin(self):
+        return int(self.cell_size * MARGINRATIO)
+
+    @property
+    def box_size(self):
+        return self.cell_size - 2 * self.margin
+
+    def center(self):
+        """centers the grid in the viewport"""
+        self.originx = self.viewport.left + (self.viewport.width - self.cell_size * self.columns) // 2
+        self.originy = self.viewport.top + (self.viewport.height - self.cell_size * self.rows) // 2
+
+    def cell_rect(self, index):
+        row, column = divmod(index, self.columns)
+        margin = self.margin
+        return Rect(self.originx + self.cell_size * column + margin, self.originy + self.cell_size * row + margin,
+                    self.box_size, self.box_size)
+
+    def cell_at(self, x, y):
+        """index of the box under a screen position, -1 for none"""
+        if not self.viewport.collidepoint(x, y):
+            return -1
+        column, cellx = divmod(x - self.originx, self.cell_size)
+        row, celly = divmod(y - self.originy, self.cell_size)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return -1
+        margin = self.margin
+        if not (margin <= cellx < margin + self.box_size and margin <= celly < margin + self.box_size):
+            return -1  # 点在方块之间的空隙里
+        return row * self.columns + column
+
+    def visible_cells(self):
+        """indices of the boxes inside the viewport, row by row"""
+        size = self.cell_size
+        first_column = max((self.viewport.left - self.originx) // size, 0)
+        last_column = min((self.viewport.right - self.originx - 1) // size, self.columns - 1)
+        first_row = max((self.viewport.top - self.originy) // size, 0)
+        last_row = min((self.viewport.bottom - self.originy - 1) // size, self.rows - 1)
+        for row in range(first_row, last_row + 1):
+            start = row * self.columns
+            yield from range(start + first_column, start + last_column + 1)
+
+    def max_visible(self, min_box_size):
+        """the most boxes of at least min_box_size the viewport can show at once, at any zoom"""
+        size = max(self.fit_size, MINCELLSIZE)
+        while size - 2 * int(size * MARGINRATIO) < min_box_size:
+            size += 1
+        if size > max(MAXCELLSIZE, self.fit_size):
+            return 0
+        # a cell cut by each edge of the viewport adds a column and a row
+        columns = min(self.viewport.width // size + 2, self.columns)
+        rows = min(self.viewport.height // size + 2, self.rows)
+        return columns * rows
+
+    def pan(self, dx, dy):
+        self.originx += dx
+        self.originy += dy
+        self._clamp()
+
+    def zoom(self, factor, pos=None):
+        """scales the cells by factor, keeping the board point under pos in place"""
+        size = int(round(self.cell_size * factor))
+        if size == self.cell_size:
+            size += 1 if factor > 1 else -1
+        size = max(min(size, max(MAXCELLSIZE, self.fit_size)), self.fit_size, MINCELLSIZE)
+        if size == self.cell_size:
+            return False
+        x, y = pos or self.viewport.center
+        self.originx = x - (x - self.originx) * size // self.cell_size
+        self.originy = y - (y - self.originy) * size // self.cell_size
+        self.cell_size = size
+        self._clamp()
+        return True
+
+    def _clamp(self):
+        """keeps the grid centered if it fits, otherwise covering the viewport"""
+        width = self.cell_size * self.columns
+        if width <= self.viewport.width:
+            self.originx = self.viewport.left + (self.viewport.width - width) // 2
+        else:
+            self.originx = min(max(self.originx, self.viewport.right - width), self.viewport.left)
+        height = self.cell_size * self.rows
+        if height <= self.viewport.height:
+            self.originy = self.viewport.top + (self.viewport.height - height) // 2
+        else:
+            self.originy = min(max(self.originy, self.viewport.bottom - height), self.viewport.top)
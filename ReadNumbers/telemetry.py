@@ -0,0 +1,152 @@
+"""
+Click telemetry
+
+Every click of a game is logged with a perf_counter_ns timestamp: the box
+clicked, the number expected, whether it was right, and the reaction time
+since the last right click (or since the board was shown). The game only
+packs the record into memory; a background thread appends the batches to
+the log file, so the frame loop never waits for the disk.
+
+The log is a b'RNCL' version header followed by tagged little-endian
+records, and several sessions can be appended to one file:
+    'S' timestamp player_len player    a player starts playing
+    'G' timestamp level columns rows   a board is shown
+    'C' timestamp cell expected correct latency
+cell is -1 for a click between the boxes, latency is in ns.
+Timestamps are taken when the game reads the click, so they are as exact
+as the frame rate the game polls events at.
+
+analyze_clicks.py computes reaction time distributions from the logs.
+"""
+
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'RNCL'
+VERSION = 1
+FLUSHINTERVAL = 0.5  # seconds between two writes of the background thread
+
+SESSION = b'S'
+GAME = b'G'
+CLICK = b'C'
+
+_HEADER = struct.Struct('<4sB')
+_SESSION = struct.Struct('<cQB')
+_GAME = struct.Struct('<cQHII')
+_CLICK = struct.Struct('<cQiI?q')
+
+
+class NullClickLog:
+    def start_session(self, player):
+        pass
+
+    def start_game(self, level, columns, rows):
+        pass
+
+    def click(self, cell, expected, correct):
+        pass
+
+    def close(self):
+        pass
+
+
+class ClickLog:
+    def __init__(self, path, flush_interval=FLUSHINTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._last_correct = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if new:
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._thread = threading.Thread(target=self._run, name='click-log', daemon=True)
+        self._thread.start()
+
+    def _append(self, record):
+        with self._lock:
+            self._pending.append(record)
+        self.records += 1
+
+    def start_session(self, player):
+        name = player.encode('utf-8')[:255]
+        self._append(_SESSION.pack(SESSION, time.perf_counter_ns(), len(name)) + name)
+
+    def start_game(self, level, columns, rows):
+        now = time.perf_counter_ns()
+        self._last_correct = now
+        self._append(_GAME.pack(GAME, now, level, columns, rows))
+
+    def click(self, cell, expected, correct):
+        now = time.perf_counter_ns()
+        self._append(_CLICK.pack(CLICK, now, cell, expected, correct, now - self._last_correct))
+        if correct:
+            self._last_correct = now
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """writes the records logged so far"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._file.write(b''.join(pending))
+            self._file.flush()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+
+def read_records(path, chunk_size=1 << 16):
+    """
+    streams the records of a log
+    :return: generator of ('session', timestamp, player),
+             ('game', timestamp, level, columns, rows) and
+             ('click', timestamp, cell, expected, correct, latency)
+    """
+    with open(path, 'rb') as f:
+        data = f.read(_HEADER.size)
+        if len(data) < _HEADER.size or _HEADER.unpack(data) != (MAGIC, VERSION):
+            raise ValueError('{} is not a version {} click log'.format(path, VERSION))
+        data = b''
+        pos = 0
+        while True:
+            chunk = f.read(chunk_size)
+            data = data[pos:] + chunk
+            pos = 0
+            while pos < len(data):
+                tag = data[pos:pos + 1]
+                if tag == CLICK:
+                    if pos + _CLICK.size > len(data):
+                        break
+                    _, timestamp, cell, expected, correct, latency = _CLICK.unpack_from(data, pos)
+                    pos += _CLICK.size
+                    yield 'click', timestamp, cell, expected, correct, latency
+                elif tag == GAME:
+                    if pos + _GAME.size > len(data):
+                        break
+                    yield ('game',) + _GAME.unpack_from(data, pos)[1:]
+                    pos += _GAME.size
+                elif tag == SESSION:
+                    if pos + _SESSION.size > len(data):
+                        break
+                    _, timestamp, length = _SESSION.unpack_from(data, pos)
+                    end = pos + _SESSION.size + length
+                    if end > len(data):
+                        break
+                    yield 'session', timestamp, data[pos + _SESSION.size:end].decode('utf-8', 'replace')
+                    pos = end
+                else:
+                    raise ValueError('bad record {!r} in {}'.format(tag, path))
+            if not chunk:
+                return  # a record cut off by a crash is dropped
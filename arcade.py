@@ -0,0 +1,11 @@
+"""
+Starts a game from any directory, see gamekit/launcher.py:
+    python /path/to/arcade.py flappybird
+"""
+
+import sys
+
+from gamekit.launcher import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import sys
+
+from gamekit.launcher import main
+
+sys.exit(main())
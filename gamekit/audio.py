@@ -0,0 +1,161 @@
+"""
+Sound effects
+
+The mixer is set up for a small output buffer before pygame starts it, and
+every sound plays on channels reserved for its category, so a burst of
+flaps can't take the channel of the crash or wait for a free one:
+    audio.pre_init()                  before startup.init('mixer')
+    AUDIO = audio.SoundBoard({'flap': 2, 'crash': 2})
+    AUDIO.add('wing', 'flap', sound)
+    AUDIO.play('wing', trigger)       trigger: perf_counter() of the input
+    AUDIO.end_frame()                 once per frame
+play() starts the sound right away. A sound triggered again in the same
+frame is merged into the first play, and when all the channels of its
+category are busy the one playing the longest is cut off. A Sound holds
+its samples already decoded to the mixer's format, so nothing is decoded or
+resampled when it plays.
+
+The latency of a play is the time from the trigger to the channel taking
+the sound, plus one output buffer (buffer / frequency) for the mixer to
+reach the speakers. stats()/report() give it per sound.
+"""
+
+import atexit
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+from gamekit.stats import percentiles
+
+FREQUENCY = 44100
+BUFFER = 256  # samples per output buffer, 5.8 ms at 44.1 kHz; pygame's default is 512
+WINDOW = 200  # plays kept per sound for the percentiles
+
+
+def pre_init(buffer=BUFFER, frequency=FREQUENCY):
+    """sets up the mixer pygame starts later, does nothing if it is already running"""
+    pygame.mixer.pre_init(frequency, -16, 2, buffer)
+
+
+class SoundBoard:
+    def __init__(self, categories, buffer=BUFFER):
+        """
+        :param categories: {category: number of channels reserved for it}
+        :param buffer: the buffer given to pre_init(), for the latency
+        """
+        self.buffer = buffer
+        self.plays = 0
+        self.merged = 0  # triggers merged into a play of the same frame
+        self.stolen = 0  # plays that cut off a sound of their category
+        self.missing = 0  # triggers of sounds not loaded yet
+        self.latencies = {}  # sound -> deque of seconds
+        self._categories = categories
+        self._channels = None  # category -> [Channel]
+        self._started = {}  # Channel -> perf_counter() it started at
+        self._sounds = {}  # name -> (category, Sound or function)
+        self._frame = set()  # sounds played in this frame
+
+    def _reserve(self):
+        total = sum(self._categories.values())
+        if pygame.mixer.get_num_channels() < total:
+            pygame.mixer.set_num_channels(total)
+        # Sound.play() elsewhere never picks a reserved channel
+        pygame.mixer.set_reserved(total)
+        self._channels = {}
+        first = 0
+        for category, count in self._categories.items():
+            self._channels[category] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            first += count
+
+    def add(self, name, category, sound):
+        """
+        :param sound: a Sound, or a function returning it and None while it is loading
+        """
+        if category not in self._categories:
+            raise ValueError('no channels for category {!r}'.format(category))
+        self._sounds[name] = (category, sound)
+
+    def play(self, name, trigger=None):
+        """
+        plays a sound on a channel of its category, at most once a frame
+        :param trigger: perf_counter() of the input that caused it, now if None
+        """
+        if trigger is None:
+            trigger = perf_counter()
+        if name in self._frame:
+            self.merged += 1
+            return
+        category, sound = self._sounds[name]
+        if callable(sound):
+            sound = sound()
+            if sound is None:
+                self.missing += 1
+                return
+        if self._channels is None:
+            if not pygame.mixer.get_init():
+                return
+            self._reserve()
+        channel = self._free_channel(category)
+        channel.play(sound)
+        now = perf_counter()
+        self._started[channel] = now
+        self._frame.add(name)
+        self.plays += 1
+
+        latencies = self.latencies.get(name)
+        if latencies is None:
+            latencies = self.latencies[name] = deque(maxlen=WINDOW)
+        latencies.append(now - trigger + self.output_latency())
+
+    def _free_channel(self, category):
+        """an idle channel of the category, or the one that started first"""
+        channels = self._channels[category]
+        for channel in channels:
+            if not channel.get_busy():
+                return channel
+        self.stolen += 1
+        return min(channels, key=lambda channel: self._started.get(channel, 0.0))
+
+    def end_frame(self):
+        self._frame.clear()
+
+    def output_latency(self):
+        """seconds one output buffer takes to play"""
+        init = pygame.mixer.get_init()
+        frequency = init[0] if init else FREQUENCY
+        return self.buffer / frequency
+
+    def stats(self):
+        """p50/p95/max latency in milliseconds of every sound over the last plays"""
+        stats = {}
+        for name, latencies in self.latencies.items():
+            stats[name] = percentiles(latencies, (50, 95, 100), scale=1000)
+            stats[name]['plays'] = len(latencies)
+        return stats
+
+    def report(self):
+        """prints the latencies of every sound"""
+        print('{:<10}{:>8}{:>8}{:>8}   (trigger to speaker, {} samples buffer = {:.1f} ms)'.format(
+            'audio ms', 'p50', 'p95', 'max', self.buffer, self.output_latency() * 1000))
+        for name, s in sorted(self.stats().items()):
+            print('{:<10}{:>8.2f}{:>8.2f}{:>8.2f}   ({} plays)'.format(name, s['p50'], s['p95'], s['max'], s['plays']))
+        print('{} plays, {} merged, {} cut off, {} not loaded'.format(
+            self.plays, self.merged, self.stolen, self.missing))
+
+
+def add_arguments(parser):
+    """adds the audio options to an argparse parser"""
+    parser.add_argument('--audio-buffer', type=int, default=BUFFER, metavar='SAMPLES',
+                        help='mixer output buffer, smaller plays sooner but may crackle (default %(default)s)')
+    parser.add_argument('--audio-stats', action='store_true',
+                        help='print the latency from input to sound on exit')
+
+
+def from_arguments(args, categories):
+    """pre_init()s the mixer and returns a SoundBoard, call it before the mixer starts"""
+    pre_init(args.audio_buffer)
+    board = SoundBoard(categories, args.audio_buffer)
+    if args.audio_stats:
+        atexit.register(board.report)
+    return board
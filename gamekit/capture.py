@@ -0,0 +1,293 @@
+"""
+Gameplay capture
+
+The game hands every finished frame to the capture right before showing it:
+    CAPTURE.capture(pygame.display.get_surface())
+capture() only copies the pixel buffer of the surface, as it is in memory,
+into the next slot of a ring allocated once. A writer thread converts the
+slots to RGB and writes them, so the game never waits for the disk or an
+encoder. When the writer falls behind and the ring is full, the new frame
+is dropped instead of waiting.
+
+Two ways to use the ring:
+    record     every frame goes to one file, the ring only absorbs hiccups
+    highlight  the ring always holds the last seconds and nothing is written
+               until save_highlight() (F9 in the games, or SIGUSR1) dumps them
+The file format comes from the extension of the path:
+    .y4m   YUV4MPEG2, plays in mpv/ffplay and ffmpeg reads it directly
+    .png   one PNG per frame, the frame number is added before the extension
+    other  raw RGB24 frames, ffplay -f rawvideo -pixel_format rgb24 -video_size WxH
+In y4m and raw files a dropped frame repeats the frame before it, so the
+video keeps the speed of the game; the PNG numbers show the gap.
+
+When recording is off the game gets a NullCapture, whose calls do nothing.
+Recording needs numpy.
+"""
+
+import atexit
+import os
+import signal
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # numpy is missing, no recording
+    np = None
+
+AVAILABLE = np is not None
+BUFFERSECONDS = 2.0  # frames the ring holds for the writer while recording
+HIGHLIGHTPATH = 'highlight-{}.y4m'  # {} is the time of the dump
+
+
+class NullCapture:
+    enabled = False
+
+    def capture(self, surface):
+        pass
+
+    def save_highlight(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FrameCapture:
+    enabled = True
+
+    def __init__(self, fps, path=None, highlight=None, highlight_path=HIGHLIGHTPATH, buffer_seconds=BUFFERSECONDS):
+        """
+        :param fps: frames per second of the game, the rate of the video
+        :param path: record every frame into this file
+        :param highlight: keep the last this many seconds for save_highlight
+        :param highlight_path: where save_highlight writes, {} is replaced by the time
+        :param buffer_seconds: seconds of frames the ring holds while recording
+        """
+        if (path is None) == (highlight is None):
+            raise ValueError('either record to a path or keep a highlight')
+        self.fps = fps
+        self.path = path
+        self.highlight = highlight
+        self.highlight_path = highlight_path
+        self.slots = max(2, int(round(fps * (highlight or buffer_seconds))))
+        self.captured = 0  # frames handed to capture()
+        self.dropped = 0  # frames not kept because the ring was full
+        self.written = 0
+        self.highlights = []  # paths of the saved highlights
+        self._ring = None  # slots x surface bytes, allocated on the first frame
+        self._numbers = None  # frame number of every slot
+        self._layout = None  # (size, pitch, bytes per pixel, byte of r, g, b)
+        self._end = 0  # frames put into the ring
+        self._read = 0  # oldest frame in the ring
+        self._dump_end = None  # frames before this are being saved as a highlight
+        self._closing = False
+        self._lock = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name='capture writer', daemon=True)
+        atexit.register(self.close)
+
+    def capture(self, surface):
+        """copies the pixels of surface into the ring, drops them if the ring is full"""
+        if self._ring is None:
+            self._allocate(surface)
+        number = self.captured
+        self.captured += 1
+        with self._lock:
+            if self._end - self._read == self.slots:
+                if self.highlight is None or self._dump_end is not None:
+                    self.dropped += 1
+                    return
+                self._read += 1  # forget the oldest frame of the highlight
+        slot = self._end % self.slots
+        # the slot is outside [_read, _end), the writer does not touch it
+        self._ring[slot] = np.frombuffer(surface.get_buffer(), np.uint8)
+        self._numbers[slot] = number
+        with self._lock:
+            self._end += 1
+            self._lock.notify()
+
+    def _allocate(self, surface):
+        size = surface.get_size()
+        bytesize = surface.get_bytesize()
+        if bytesize not in (3, 4):
+            raise ValueError('cannot record a {} bit surface'.format(surface.get_bitsize()))
+        channels = [shift // 8 for shift in surface.get_shifts()[:3]]
+        if sys.byteorder == 'big':
+            channels = [bytesize - 1 - channel for channel in channels]
+        self._layout = (size, surface.get_pitch(), bytesize, channels)
+        self._ring = np.empty((self.slots, surface.get_pitch() * size[1]), np.uint8)
+        self._numbers = [0] * self.slots
+        self._writer.start()
+
+    def save_highlight(self):
+        """writes the frames in the ring to a new file, in the background"""
+        if self.highlight is None or self._ring is None:
+            return
+        with self._lock:
+            if self._dump_end is not None:
+                return  # still saving the last one
+            self._dump_end = self._end
+            self._lock.notify()
+
+    def close(self):
+        """writes what is left to write and stops the writer"""
+        if self._closing:
+            return
+        with self._lock:
+            self._closing = True
+            self._lock.notify()
+        if self._writer.is_alive():
+            self._writer.join()
+        if self.captured:
+            print('capture: {} frames, {} written, {} dropped{}'.format(
+                self.captured, self.written, self.dropped,
+                ''.join(', highlight ' + path for path in self.highlights)))
+
+    def _run(self):
+        if self.path is not None:
+            writer = open_writer(self.path, self._layout[0], self.fps)
+            try:
+                self._write_frames(writer, None)
+            finally:
+                writer.close()
+        else:
+            while True:
+                with self._lock:
+                    while self._dump_end is None and not self._closing:
+                        self._lock.wait()
+                    if self._dump_end is None:
+                        return
+                path = self.highlight_path.format(time.strftime('%Y%m%d-%H%M%S'))
+                writer = open_writer(path, self._layout[0], self.fps)
+                try:
+                    self._write_frames(writer, self._dump_end)
+                finally:
+                    writer.close()
+                    self.highlights.append(path)
+                    with self._lock:
+                        self._dump_end = None
+
+    def _write_frames(self, writer, end):
+        """writes the frames of the ring until end, or until closed when end is None"""
+        while True:
+            with self._lock:
+                while self._read == self._end and end is None and not self._closing:
+                    self._lock.wait()
+                if self._read == (self._end if end is None else end):
+                    return
+                slot = self._read % self.slots
+            # capture() does not write into the slots in [_read, _end)
+            writer.write(self._numbers[slot], self._rgb(self._ring[slot]))
+            self.written += 1
+            with self._lock:
+                self._read += 1
+
+    def _rgb(self, pixels):
+        """the height x width x 3 RGB array of the bytes of a slot"""
+        (width, height), pitch, bytesize, channels = self._layout
+        rows = pixels.reshape(height, pitch)[:, :width * bytesize].reshape(height, width, bytesize)
+        return rows[:, :, channels]
+
+
+class _Writer:
+    def __init__(self, path, size, fps):
+        self.size = size
+        self.last = None  # number and bytes of the last frame written
+        self.file = open(path, 'wb')
+        self.file.write(self.header(size, fps))
+
+    def header(self, size, fps):
+        return b''
+
+    def encode(self, rgb):
+        return rgb.tobytes()
+
+    def write(self, number, rgb):
+        data = self.encode(rgb)
+        if self.last is not None:
+            # repeat the last frame for the dropped ones
+            for _ in range(number - self.last[0] - 1):
+                self.file.write(self.last[1])
+        self.file.write(data)
+        self.last = (number, data)
+
+    def close(self):
+        self.file.close()
+
+
+class RawWriter(_Writer):
+    """RGB24 frames one after the other"""
+
+
+class Y4MWriter(_Writer):
+    """YUV4MPEG2 frames, 4:2:0 when the size is even, otherwise 4:4:4"""
+
+    def header(self, size, fps):
+        width, height = size
+        self.subsample = width % 2 == 0 and height % 2 == 0
+        return 'YUV4MPEG2 W{} H{} F{}:1 Ip A1:1 {}\n'.format(
+            width, height, fps, 'C420jpeg' if self.subsample else 'C444').encode('ascii')
+
+    def encode(self, rgb):
+        # BT.601, studio range
+        r, g, b = (rgb[:, :, i].astype(np.int32) for i in range(3))
+        y = ((66 * r + 129 * g + 25 * b + 128) >> 8) + 16
+        u = ((-38 * r - 74 * g + 112 * b + 128) >> 8) + 128
+        v = ((112 * r - 94 * g - 18 * b + 128) >> 8) + 128
+        if self.subsample:
+            height, width = y.shape
+            u = (u.reshape(height // 2, 2, width // 2, 2).sum(axis=(1, 3)) + 2) >> 2
+            v = (v.reshape(height // 2, 2, width // 2, 2).sum(axis=(1, 3)) + 2) >> 2
+        return b''.join((b'FRAME\n', y.astype(np.uint8).tobytes(), u.astype(np.uint8).tobytes(),
+                         v.astype(np.uint8).tobytes()))
+
+
+class PNGWriter:
+    """one PNG per frame, path-000001.png, path-000002.png, ..."""
+
+    def __init__(self, path, size, fps):
+        import pygame
+        self.pygame = pygame
+        self.root, self.ext = os.path.splitext(path)
+
+    def write(self, number, rgb):
+        image = self.pygame.image.frombuffer(rgb.tobytes(), (rgb.shape[1], rgb.shape[0]), 'RGB')
+        self.pygame.image.save(image, '{}-{:06d}{}'.format(self.root, number, self.ext))
+
+    def close(self):
+        pass
+
+
+def open_writer(path, size, fps):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.y4m':
+        return Y4MWriter(path, size, fps)
+    if ext == '.png':
+        return PNGWriter(path, size, fps)
+    return RawWriter(path, size, fps)
+
+
+def create(fps, path=None, highlight=None, highlight_path=HIGHLIGHTPATH):
+    """a FrameCapture if recording or keeping a highlight, otherwise a NullCapture"""
+    if path or highlight:
+        frame_capture = FrameCapture(fps, path, highlight, highlight_path)
+        if highlight and hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: frame_capture.save_highlight())
+        return frame_capture
+    return NullCapture()
+
+
+def add_arguments(parser):
+    """adds the recording options to an argparse parser"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--capture', metavar='FILE',
+                       help='record the game into FILE (.y4m, .png for one file per frame, otherwise raw RGB)')
+    group.add_argument('--highlight', type=float, metavar='SECONDS',
+                       help='keep the last SECONDS of the game, F9 or SIGUSR1 saves them')
+    parser.add_argument('--highlight-path', default=HIGHLIGHTPATH, metavar='PATH',
+                        help='where highlights are saved, {{}} is the time (default {})'.format(HIGHLIGHTPATH))
+
+
+def from_arguments(args, fps):
+    return create(fps, args.capture, args.highlight, args.highlight_path)
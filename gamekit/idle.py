@@ -0,0 +1,67 @@
+"""
+Idle waiting for menus and end screens
+
+A menu that polls pygame.event.get() and redraws at a fixed FPS keeps a core
+busy while nobody is playing. IdleWait hands out the events of each frame
+instead: while the screen is animating it polls like before, but once the
+screen is still, or nobody touched anything for idle_after seconds, it
+blocks in pygame.event.wait until an event arrives:
+    idle = IdleWait()
+    while True:
+        for event in idle.poll(animating):
+            ...
+        if idle.idle:
+            if idle.exposed:
+                pygame.display.update()
+            continue
+        ...  # step, draw and update as usual
+"""
+
+import time
+
+import pygame
+from pygame.locals import *
+
+IDLEAFTER = 10.0  # seconds without input before an animated screen stops
+
+INPUTEVENTS = frozenset((KEYDOWN, KEYUP, MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL,
+                         JOYBUTTONDOWN, JOYAXISMOTION, JOYHATMOTION, FINGERDOWN))
+EXPOSEEVENTS = frozenset((VIDEOEXPOSE, WINDOWEXPOSED))
+
+
+class IdleWait:
+    def __init__(self, idle_after=IDLEAFTER):
+        """
+        :param idle_after: seconds without input before an animated screen
+                           stops, None keeps it animating
+        """
+        self.idle_after = idle_after
+        self.last_input = time.monotonic()
+        self.idle = False  # the screen is still, nothing needs drawing
+        self.woke = False  # this poll ended an idle period
+        self.exposed = False  # the window needs to be shown again
+        self.wait_time = 0.0  # seconds spent blocked in total
+
+    def poll(self, animating=True):
+        """
+        the events of the next frame
+        :param animating: the screen changes by itself, poll without waiting
+        """
+        was_idle = self.idle
+        if animating and not self._timed_out():
+            events = pygame.event.get()
+        else:
+            begin_time = time.monotonic()
+            event = pygame.event.wait()
+            events = [] if event.type == NOEVENT else [event] + pygame.event.get()
+            self.wait_time += time.monotonic() - begin_time
+
+        if any(event.type in INPUTEVENTS for event in events):
+            self.last_input = time.monotonic()
+        self.idle = not animating or self._timed_out()
+        self.woke = was_idle and not self.idle
+        self.exposed = any(event.type in EXPOSEEVENTS for event in events)
+        return events
+
+    def _timed_out(self):
+        return self.idle_after is not None and time.monotonic() - self.last_input > self.idle_after
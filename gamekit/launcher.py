@@ -0,0 +1,60 @@
+"""
+Game launcher
+
+Starts any of the games. From the root of the repository, where Python
+finds the gamekit package:
+    python -m gamekit flappybird --dirty-rects
+    python -m gamekit --startup-profile catcher --storm
+and from any other directory by the path of arcade.py:
+    python /path/to/arcade.py readnumbers --grid 100x100
+The games find their files next to their modules either way.
+Only the game asked for is imported, together with the modules next to it,
+and the game initializes only the pygame subsystems it uses. Everything
+after the name of the game goes to the game's own options. With
+--startup-profile the time to the first frame is printed, split into
+import, init, assets and first frame (startup.py).
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+from gamekit import startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (directory, module), the module has a run() reading sys.argv
+GAMES = {
+    'flappybird': ('FlappyBird', 'FlappyBird'),
+    'catcher': ('Catcher', 'Catcher'),
+    'readnumbers': ('ReadNumbers', 'ReadNumbers'),
+}
+
+
+def load(name):
+    """imports the module of a game, its directory goes first on sys.path for the modules next to it"""
+    directory, module = GAMES[name]
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module)
+
+
+def main(argv=None):
+    startup.phase('launcher')
+    parser = argparse.ArgumentParser(prog='python -m gamekit', description='starts one of the games')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='print the time spent in import, init, assets and the first frame')
+    parser.add_argument('game', choices=sorted(GAMES))
+    parser.add_argument('options', nargs=argparse.REMAINDER, help='options of the game, see GAME --help')
+    args = parser.parse_args(argv)
+    if args.startup_profile:
+        startup.enable()
+
+    startup.phase('import')
+    game = load(args.game)
+    startup.phase('setup')
+    sys.argv = [args.game] + args.options
+    game.run()
+    return 0
@@ -0,0 +1,104 @@
+"""
+Background loading
+
+An AssetLoader decodes assets on one worker thread, the lowest priority
+first and jobs of the same priority in the order they came:
+    loader = AssetLoader()
+    future = loader.submit(pygame.mixer.Sound, path, priority=1)
+    ...
+    if future.done():            # never waits
+        future.result().play()
+    sound = loader.result(future)  # waits, or runs the job right here
+result() doesn't wait behind the queue: a job the worker hasn't started yet
+is taken out of the queue and run by the caller, so asking for an asset
+costs at most its own decode, and a job asking for another one can't wait
+for itself. prioritize() moves a queued job forward.
+
+Image and sound decoding release the GIL, so the game keeps drawing while
+the worker decodes. Only give the worker jobs that make new objects, like
+decoding a file: SDL locks a surface while it reads its pixels, and a blit
+of a surface locked by the worker fails on the thread drawing. Rotations,
+masks and conversions of surfaces the game may draw belong to that thread.
+"""
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+
+
+class _Job:
+    __slots__ = ('future', 'fn', 'args')
+
+    def __init__(self, fn, args):
+        self.future = Future()
+        self.fn = fn
+        self.args = args
+
+
+class AssetLoader:
+    def __init__(self, name='asset loader'):
+        self.submitted = 0
+        self.completed = 0
+        self._queue = []  # (priority, order, job), a job moved forward is queued again
+        self._waiting = {}  # future -> job, the jobs nobody started yet
+        self._order = itertools.count()
+        self._lock = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, priority=0):
+        """runs fn(*args) in the background, returns its Future"""
+        job = _Job(fn, args)
+        with self._lock:
+            self._waiting[job.future] = job
+            heapq.heappush(self._queue, (priority, next(self._order), job))
+            self.submitted += 1
+            self._lock.notify()
+        return job.future
+
+    def prioritize(self, future, priority):
+        """runs a job that is still queued with this priority instead"""
+        with self._lock:
+            job = self._waiting.get(future)
+            if job is not None:
+                heapq.heappush(self._queue, (priority, next(self._order), job))
+                self._lock.notify()
+
+    def result(self, future):
+        """the result of a job, runs it in this thread if it hasn't started"""
+        with self._lock:
+            job = self._waiting.pop(future, None)
+        if job is not None:
+            self._execute(job)
+        return future.result()
+
+    def done(self):
+        return self.completed == self.submitted
+
+    def progress(self):
+        """the fraction of the jobs completed"""
+        return self.completed / self.submitted if self.submitted else 1.0
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while True:
+                    while not self._queue:
+                        self._lock.wait()
+                    job = heapq.heappop(self._queue)[2]
+                    # skip jobs started by result() and the old entries of moved jobs
+                    if self._waiting.pop(job.future, None) is not None:
+                        break
+            self._execute(job)
+
+    def _execute(self, job):
+        if job.future.set_running_or_notify_cancel():
+            try:
+                result = job.fn(*job.args)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+        with self._lock:
+            self.completed += 1
@@ -0,0 +1,178 @@
+"""
+Frame phase profiler
+
+The game loop marks where each phase of a frame starts:
+    PROFILER.begin_frame()
+    PROFILER.phase('event')   ... pygame.event.get()
+    PROFILER.phase('update')  ... move the sprites
+    PROFILER.phase('draw')    ... blit
+    PROFILER.phase('flip')    ... pygame.display.update()
+    PROFILER.phase('tick')    ... FPSCLOCK.tick()
+    PROFILER.end_frame()
+A phase lasts until the next mark, and a phase marked more than once in a frame
+adds up. The profiler keeps the last frames of every phase for p50/p95/p99,
+can draw them over the game, and writes a Chrome trace (chrome://tracing or
+Perfetto) on exit.
+
+When profiling is off the game gets a NullProfiler, whose marks do nothing.
+"""
+
+import atexit
+import json
+import os
+from collections import deque
+from time import perf_counter_ns
+
+from gamekit.stats import percentiles
+
+PHASES = ('event', 'update', 'collision', 'draw', 'flip', 'tick')
+WINDOW = 300  # frames kept for the percentiles
+MAXTRACEEVENTS = 200000
+HUDINTERVAL = 15  # frames between two refreshes of the overlay
+
+
+class NullProfiler:
+    enabled = False
+    hud = False
+
+    def begin_frame(self):
+        pass
+
+    def phase(self, name):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def draw_hud(self, surface):
+        pass
+
+
+class FrameProfiler:
+    enabled = True
+
+    def __init__(self, window=WINDOW, hud=False, trace_path=None, pid=None):
+        self.hud = hud
+        self.trace_path = trace_path
+        self.frames = 0
+        self.timings = {}  # phase -> deque of ns per frame
+        self._window = window
+        self._frame_start = None
+        self._phase = None
+        self._phase_start = 0
+        self._current = {}
+        self._trace = deque(maxlen=MAXTRACEEVENTS) if trace_path else None
+        self._pid = os.getpid() if pid is None else pid
+        self._hud_lines = []
+        self._hud_font = None
+        if trace_path:
+            atexit.register(self.dump_trace, trace_path)
+
+    def begin_frame(self):
+        if self._frame_start is not None:
+            self.end_frame()
+        self._frame_start = self._phase_start = perf_counter_ns()
+        self._phase = None
+
+    def phase(self, name):
+        now = perf_counter_ns()
+        if self._phase is not None:
+            self._add(self._phase, self._phase_start, now)
+        self._phase = name
+        self._phase_start = now
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        now = perf_counter_ns()
+        if self._phase is not None:
+            self._add(self._phase, self._phase_start, now)
+        self._current['frame'] = now - self._frame_start
+        if self._trace is not None:
+            self._trace.append(('frame', self._frame_start, now - self._frame_start))
+        for name, duration in self._current.items():
+            timings = self.timings.get(name)
+            if timings is None:
+                timings = self.timings[name] = deque(maxlen=self._window)
+            timings.append(duration)
+        self._current = {}
+        self._frame_start = self._phase = None
+        self.frames += 1
+
+    def _add(self, name, start, end):
+        self._current[name] = self._current.get(name, 0) + end - start
+        if self._trace is not None:
+            self._trace.append((name, start, end - start))
+
+    def stats(self):
+        """p50/p95/p99/max in milliseconds of every phase over the last frames"""
+        stats = {}
+        for name, timings in self.timings.items():
+            stats[name] = percentiles(timings, scale=1e-6)
+        return stats
+
+    def draw_hud(self, surface):
+        """draws the percentiles in the top left corner"""
+        if not self.hud:
+            return
+        import pygame
+        if self._hud_font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self._hud_font = pygame.font.SysFont('monospace', 11)
+        if self.frames % HUDINTERVAL == 0 or not self._hud_lines:
+            stats = self.stats()
+            lines = ['{:<9}{:>6}{:>6}{:>6}'.format('ms', 'p50', 'p95', 'p99')]
+            for name in PHASES + ('frame',):
+                if name in stats:
+                    s = stats[name]
+                    lines.append('{:<9}{:>6.2f}{:>6.2f}{:>6.2f}'.format(name, s['p50'], s['p95'], s['p99']))
+            self._hud_lines = [self._hud_font.render(line, True, (255, 255, 0), (0, 0, 0)) for line in lines]
+        y = 2
+        for line in self._hud_lines:
+            surface.blit(line, (2, y))
+            y += line.get_height()
+
+    def report(self):
+        """prints the percentiles of every phase"""
+        stats = self.stats()
+        print('{:<10}{:>8}{:>8}{:>8}{:>8}   ({} frames)'.format('ms', 'p50', 'p95', 'p99', 'max', self.frames))
+        for name in PHASES + ('frame',):
+            if name in stats:
+                s = stats[name]
+                print('{:<10}{:>8.2f}{:>8.2f}{:>8.2f}{:>8.2f}'.format(name, s['p50'], s['p95'], s['p99'], s['max']))
+
+    def dump_trace(self, path=None):
+        """writes the recorded phases in the Chrome trace event format"""
+        path = path or self.trace_path
+        events = [{
+            'name': name, 'cat': 'frame' if name == 'frame' else 'phase', 'ph': 'X',
+            'ts': start / 1000.0, 'dur': duration / 1000.0,
+            'pid': self._pid, 'tid': 0 if name == 'frame' else 1,
+        } for name, start, duration in self._trace or ()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'stats': self.stats()}}, f)
+
+
+def create(profile=False, hud=False, trace_path=None):
+    """a FrameProfiler if any of the options is on, otherwise a NullProfiler"""
+    if profile or hud or trace_path:
+        frame_profiler = FrameProfiler(hud=hud, trace_path=trace_path)
+        if profile:
+            atexit.register(frame_profiler.report)
+        return frame_profiler
+    return NullProfiler()
+
+
+def add_arguments(parser):
+    """adds the profiling options to an argparse parser"""
+    parser.add_argument('--profile', action='store_true',
+                        help='time the phases of every frame and print them on exit')
+    parser.add_argument('--profile-hud', action='store_true', help='show the frame timings over the game')
+    parser.add_argument('--profile-trace', metavar='FILE',
+                        help='write a Chrome trace of the frames to FILE on exit')
+
+
+def from_arguments(args):
+    return create(args.profile, args.profile_hud, args.profile_trace)
@@ -0,0 +1,93 @@
+"""
+Startup timing
+
+Splits the time from the launcher starting to the first frame on the screen
+into phases. The launcher and the game mark where each phase starts, a
+phase lasts until the next mark:
+    startup.phase('import')       launcher, before importing the game
+    startup.init('display')       game, the pygame subsystems it uses
+    startup.phase('assets')       game, decoding images and sounds
+    startup.phase('first frame')  game, drawing the first frame
+    startup.first_frame()         game, after the first display update
+With startup.enable() the first first_frame() prints the phases. Marks are
+cheap and kept either way, first_frame() does nothing after the first call.
+Time spent starting the interpreter before gamekit.startup is imported is
+not counted.
+"""
+
+import time
+
+
+class StartupProfile:
+    def __init__(self):
+        self.begin = time.perf_counter()
+        self.enabled = False
+        self.phases = []  # (name, seconds) in order, a name marked twice adds up
+        self.subsystems = []  # pygame subsystems init() started
+        self.total = None  # seconds to the first frame
+        self._phase = None
+        self._phase_start = self.begin
+
+    def phase(self, name):
+        now = time.perf_counter()
+        self._close(now)
+        self._phase = name
+        self._phase_start = now
+
+    def _close(self, now):
+        if self._phase is None:
+            return
+        for i, (name, seconds) in enumerate(self.phases):
+            if name == self._phase:
+                self.phases[i] = (name, seconds + now - self._phase_start)
+                break
+        else:
+            self.phases.append((self._phase, now - self._phase_start))
+        self._phase = None
+
+    def init(self, *names):
+        """initializes only the pygame subsystems the game needs, 'display', 'font', 'mixer'..."""
+        import pygame
+        self.phase('init')
+        for name in names:
+            module = getattr(pygame, name)
+            if not module.get_init():
+                module.init()
+                self.subsystems.append(name)
+
+    def first_frame(self):
+        if self.total is not None:
+            return
+        now = time.perf_counter()
+        self._close(now)
+        self.total = now - self.begin
+        if self.enabled:
+            self.report()
+
+    def report(self):
+        print('startup {:.1f} ms to the first frame'.format(self.total * 1000))
+        for name, seconds in self.phases:
+            print('  {:<12}{:>8.1f} ms'.format(name, seconds * 1000))
+        other = self.total - sum(seconds for _, seconds in self.phases)
+        if other > 0.0005:
+            print('  {:<12}{:>8.1f} ms'.format('other', other * 1000))
+        print('  pygame subsystems: {}'.format(', '.join(self.subsystems) or 'none'))
+
+
+STARTUP = StartupProfile()
+
+
+def enable():
+    STARTUP.enabled = True
+
+
+def phase(name):
+    STARTUP.phase(name)
+
+
+def init(*names):
+    STARTUP.init(*names)
+
+
+def first_frame():
+    STARTUP.first_frame()
@@ -0,0 +1,23 @@
+"""
+Percentiles
+
+The reports of the games give the same nearest-rank percentiles of a window
+of samples, the value at (count - 1) * p // 100 of the sorted samples:
+    percentiles(self.times, (50, 95, 99, 100), scale=1000)
+    -> {'p50': ..., 'p95': ..., 'p99': ..., 'max': ...}
+"""
+
+PERCENTILES = (50, 95, 99, 100)
+
+
+def percentiles(values, ps=PERCENTILES, scale=1):
+    """
+    :param ps: the percentiles to give, 100 is named 'max'
+    :param scale: multiplies every percentile, e.g. 1000 for seconds to ms
+    :return: {'p50': value, ...}, empty if there are no values
+    """
+    values = sorted(values)
+    if not values:
+        return {}
+    last = len(values) - 1
+    return {'max' if p == 100 else 'p{}'.format(p): values[last * p // 100] * scale for p in ps}
@@ -0,0 +1,158 @@
+"""
+Font and text surface cache
+
+Opening a font reads and parses the font file, and rendering a string
+rasterizes every glyph, yet the games show the same few strings frame after
+frame. Fonts are cached by (path, size) and rendered text by (font, text,
+antialias, color, background), each in an LRU cache:
+    surf = text.render('LEVEL 3', 60, RED, FONTPATH)
+    surf = text.render('MISS: 2', 16, GREEN, 'Arial', sysfont=True)
+The module functions use one cache shared by everything in the process.
+Rendered surfaces are shared too, blit them but don't draw on them.
+A screen drawing more distinct strings than TEXTCACHESIZE every frame would
+evict each one before it is drawn again, so it reserve()s room for them:
+    text.reserve(board.max_visible(MINTEXTBOXSIZE))
+
+load_async() opens fonts on the thread of a gamekit.loader.AssetLoader
+ahead of their first use; the caches themselves are only used by the
+thread drawing.
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+FONTCACHESIZE = 16
+TEXTCACHESIZE = 256
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, build, *args):
+        """the value of key, calls build(*args) and keeps the result if it's missing"""
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            value = self._items[key] = build(*args)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+            return value
+        self.hits += 1
+        self._items.move_to_end(key)
+        return value
+
+    def resize(self, maxsize):
+        """changes maxsize, dropping the least recently used items that no longer fit"""
+        self.maxsize = maxsize
+        while len(self._items) > maxsize:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._items),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _load_font(path, size, sysfont):
+    if not pygame.font.get_init():
+        pygame.font.init()
+    if sysfont:
+        return pygame.font.SysFont(path, size)
+    return pygame.font.Font(path, size)
+
+
+class TextCache:
+    def __init__(self, max_fonts=FONTCACHESIZE, max_texts=TEXTCACHESIZE):
+        self.fonts = LRUCache(max_fonts)
+        self.texts = LRUCache(max_texts)
+        self.max_texts = max_texts
+        self._pending = {}  # (path, size, sysfont) -> Future of a font opened by load_async
+        self._loader = None
+
+    def font(self, path, size, sysfont=False):
+        """
+        :param path: font file, None for pygame's default font
+        :param sysfont: path is the name of a system font instead
+        """
+        key = (path, size, sysfont)
+        future = self._pending.pop(key, None)
+        if future is not None:
+            # waits for the loader if it isn't open yet
+            return self.fonts.get(key, self._loader.result, future)
+        return self.fonts.get(key, _load_font, path, size, sysfont)
+
+    def load_async(self, loader, fonts, priority=0):
+        """
+        opens fonts in the background before they are first used
+        :param fonts: (path, size, sysfont) of every font
+        """
+        self._loader = loader
+        for path, size, sysfont in fonts:
+            key = (path, size, sysfont)
+            if key not in self._pending and key not in self.fonts:
+                self._pending[key] = loader.submit(_load_font, path, size, sysfont, priority=priority)
+
+    def render(self, text, size, color, path=None, antialias=True, background=None, sysfont=False):
+        text = str(text)
+        key = (path, size, sysfont, text, antialias, tuple(color), background and tuple(background))
+        return self.texts.get(key, self._render, text, size, color, path, antialias, background, sysfont)
+
+    def _render(self, text, size, color, path, antialias, background, sysfont):
+        return self.font(path, size, sysfont).render(text, antialias, color, background)
+
+    def reserve(self, count):
+        """makes room for count texts drawn every frame on top of max_texts, 0 gives it back"""
+        self.texts.resize(self.max_texts + count)
+
+    def clear(self):
+        self.fonts.clear()
+        self.texts.clear()
+
+    def stats(self):
+        return {'fonts': self.fonts.stats(), 'texts': self.texts.stats()}
+
+
+CACHE = TextCache()
+
+
+def font(path, size, sysfont=False):
+    return CACHE.font(path, size, sysfont)
+
+
+def render(text, size, color, path=None, antialias=True, background=None, sysfont=False):
+    return CACHE.render(text, size, color, path, antialias, background, sysfont)
+
+
+def load_async(loader, fonts, priority=0):
+    CACHE.load_async(loader, fonts, priority)
+
+
+def reserve(count):
+    CACHE.reserve(count)
+
+
+def stats():
+    return CACHE.stats()
@@ -0,0 +1,40 @@
+"""
+Varints
+
+An unsigned int is written 7 bits a byte, the lowest first, with the high
+bit set on every byte but the last, so small numbers take one byte. Signed
+ints go through zigzag() first, which maps 0, -1, 1, -2, ... to 0, 1, 2,
+3, ... so small negative numbers stay small:
+    out = bytearray()
+    varint.put(out, varint.zigzag(-3))
+    value, pos = varint.get(out, 0)
+The FlappyBird replays and the Catcher room protocol are written with them.
+"""
+
+
+def put(out, value):
+    """appends value >= 0 to the bytearray out"""
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def get(data, pos):
+    """the value at data[pos:] and the position after it, IndexError if it is cut short"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
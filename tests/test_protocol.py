@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+import protocol
+
+
+def payload(message):
+    """the payload of a frame, without its length"""
+    return message[2:]
+
+
+def test_frame_length():
+    message = protocol.join(7)
+    assert int.from_bytes(message[:2], 'little') == len(message) - 2
+
+
+def test_keyframe_round_trip():
+    state = [200, 3, 0, 120, -40, 65, 5000]
+    decoder = protocol.StateDecoder()
+    assert decoder.decode(payload(protocol.encode_keyframe(9, state))) == state
+    assert decoder.tick == 9
+
+
+def test_deltas_round_trip():
+    states = [[200, 0, 0, 50, 10], [205, 0, 0, 50, 14], [205, 1, 0, 50, 18], [-5, 1, 2, 50, 18]]
+    encoder = protocol.StateEncoder()
+    decoder = protocol.StateDecoder()
+    for tick, state in enumerate(states):
+        assert decoder.decode(payload(encoder.encode(tick, state))) == state
+    assert (encoder.keyframes, encoder.deltas) == (1, 3)
+
+
+def test_new_length_is_a_keyframe():
+    encoder = protocol.StateEncoder()
+    encoder.encode(0, [1, 2, 3])
+    message = encoder.encode(1, [1, 2, 3, 4, 5])
+    assert payload(message)[:1] == protocol.KEYFRAME
+
+
+def test_keyframe_interval():
+    encoder = protocol.StateEncoder(keyframe_interval=4)
+    kinds = [payload(encoder.encode(tick, [tick]))[:1] for tick in range(1, 9)]
+    assert kinds.count(protocol.KEYFRAME) == 3  # the first, 4 and 8
+
+
+def test_delta_before_keyframe():
+    delta = protocol.encode_delta(1, [0], [1])
+    with pytest.raises(ValueError):
+        protocol.StateDecoder().decode(payload(delta))
+
+
+def test_read_frame():
+    async def read(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return [await protocol.read_frame(reader), await protocol.read_frame(reader)]
+
+    message = protocol.input_message(-1)
+    assert asyncio.run(read(message)) == [payload(message), None]
@@ -0,0 +1,28 @@
+import pytest
+
+from replay import Replay, MAGIC
+
+
+def test_round_trip():
+    replay = Replay(0xdeadbeef, -12, 7, [0, 1, 2, 30, 31, 200], score=5, crash_frame=210,
+                    player_index=2, pipe_index=1)
+    decoded = Replay.decode(replay.encode())
+    assert vars(decoded) == vars(replay)
+
+
+def test_round_trip_unfinished():
+    replay = Replay(1, 244, 0)
+    decoded = Replay.decode(replay.encode())
+    assert vars(decoded) == vars(replay)
+    assert decoded.crash_frame == -1
+
+
+def test_runs():
+    assert Replay(0, 0, 0, [3, 4, 5, 9, 11, 12]).runs() == [[3, 3], [3, 1], [1, 2]]
+
+
+def test_not_a_replay():
+    with pytest.raises(ValueError):
+        Replay.decode(b'PNG\x01\x00')
+    with pytest.raises(ValueError):
+        Replay.decode(MAGIC + b'\x63')
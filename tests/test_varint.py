@@ -0,0 +1,46 @@
+import pytest
+
+from gamekit import varint
+
+VALUES = [0, 1, 0x7f, 0x80, 0x3fff, 0x4000, 2 ** 32 - 1, 2 ** 63 + 5]
+
+
+@pytest.mark.parametrize('value', VALUES)
+def test_round_trip(value):
+    out = bytearray(b'xy')
+    varint.put(out, value)
+    assert varint.get(out, 2) == (value, len(out))
+
+
+def test_small_values_take_one_byte():
+    for value, size in [(0, 1), (0x7f, 1), (0x80, 2), (0x3fff, 2), (0x4000, 3)]:
+        out = bytearray()
+        varint.put(out, value)
+        assert len(out) == size
+
+
+def test_values_back_to_back():
+    out = bytearray()
+    for value in VALUES:
+        varint.put(out, value)
+    pos = 0
+    for value in VALUES:
+        decoded, pos = varint.get(out, pos)
+        assert decoded == value
+    assert pos == len(out)
+
+
+def test_cut_short():
+    out = bytearray()
+    varint.put(out, 0x4000)
+    with pytest.raises(IndexError):
+        varint.get(out[:-1], 0)
+
+
+@pytest.mark.parametrize('value', [0, 1, -1, 2, -2, 63, -64, 64, -65, 2 ** 40, -2 ** 40])
+def test_zigzag_round_trip(value):
+    assert varint.unzigzag(varint.zigzag(value)) == value
+
+
+def test_zigzag_order():
+    assert [varint.zigzag(v) for v in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]